@@ -0,0 +1,7 @@
+from api import API
+
+api = API()
+api.init()
+
+store = api.players.compileStore()
+print(f"Compiled {store}")
@@ -0,0 +1,66 @@
+import os, sys, json, argparse, subprocess
+
+"""
+    Import time benchmark.
+
+    Imports each entry point in a fresh interpreter (like a spawned worker process) and checks that it stays
+    within its import time budget and that it doesn't load the heavy dependencies that are only needed later
+    (they are imported on first use). Exits with an error if a budget is exceeded.
+"""
+
+# Module -> budget in seconds
+BUDGETS = {
+    "api": 0.3,
+    "pipeline": 0.3,
+    "environment": 0.6,
+    "algorithms.SARSA.train": 0.6,
+    "algorithms.REINFORCE.train": 0.6,
+    "algorithms.DQN.train": 0.6,
+    "algorithms.PPO.train": 0.6,
+}
+
+# Modules that must not be loaded by importing the entry points
+DEFERRED = ["scipy", "requests", "matplotlib", "altair", "pandas", "torch", "sqlite3"]
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"time": elapsed, "loaded": [name for name in {deferred!r} if name in sys.modules]}}))
+"""
+
+def measure(module, repeat):
+    """Return the best import time of a module over `repeat` fresh interpreters, and the deferred modules it loaded."""
+    best, loaded = None, []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, deferred=DEFERRED)],
+            capture_output=True, text=True, cwd=os.getcwd(),
+        )
+        if result.returncode != 0:
+            raise Exception(result.stderr.strip().splitlines()[-1])
+        output = json.loads(result.stdout.strip().splitlines()[-1])
+        best = output["time"] if best is None else min(best, output["time"])
+        loaded = output["loaded"]
+    return best, loaded
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the import time budget of the entry points")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of fresh interpreters per module")
+    args = parser.parse_args()
+
+    failed = False
+    for module, budget in BUDGETS.items():
+        try:
+            elapsed, loaded = measure(module, args.repeat)
+        except Exception as e:
+            # e.g. gymnasium is not installed on this machine
+            print(f"{module:<28} skipped ({e})")
+            continue
+        ok = elapsed <= budget and not loaded
+        failed = failed or not ok
+        print(f"{module:<28} {elapsed:6.3f}s / {budget:.1f}s {'ok' if ok else 'FAILED'}"
+              + (f" (loaded {', '.join(loaded)})" if loaded else ""))
+
+    sys.exit(1 if failed else 0)
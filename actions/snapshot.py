@@ -0,0 +1,26 @@
+import time, argparse
+
+from api import API
+
+"""
+    Season snapshot.
+
+    Exports the data and static files to a single archive, or imports an archive on a node without
+    network access. Imported data is used as it is: run the API with `API(offline=True)` on those nodes.
+"""
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import a snapshot of the season data")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("path", help="Path of the snapshot archive")
+    parser.add_argument("--compress", action="store_true", help="Compress the exported archive with gzip")
+    args = parser.parse_args()
+
+    api = API(offline=True)
+    start = time.time()
+    if args.action == "export":
+        files = api.exportSnapshot(args.path, compress=args.compress)
+        print(f"Exported {files} files to {args.path} in {time.time() - start:.1f}s")
+    else:
+        files = api.importSnapshot(args.path)
+        print(f"Imported {files} files from {args.path} in {time.time() - start:.1f}s")
@@ -1,19 +1,108 @@
-from api import API 
+import os, json, time, argparse
 from tqdm import tqdm
 
-api = API()
-api.init()
-
-weeks = api.teams.getWeekIds()
-for week in tqdm(weeks, desc="weeks"):
-    matches = api.teams.getWeekMatches(week)
-    for match in tqdm(matches, desc="matches"):
-        teams = [match["local"]["id"], match["visitor"]["id"]]
-        for team_id in tqdm(teams, desc="teams"):
-            players = api.teams.getPlayers(team_id)
-            for player in tqdm(players, desc="players"):
-                player_id = player["id"]
-                try:
-                    stats = api.players.getStats(player_id)
-                except Exception as e:
-                    raise Exception(f"Error getting player {player_id} info: {e}")
\ No newline at end of file
+from api import API
+
+"""
+    Season sync.
+
+    Refreshes every file of the season with one request per unique resource: first the matches of every
+    week, then the players of every unique team found in those matches and finally the stats of every
+    unique player found in those teams. Requests go through `FileManager.refresh_many` in chunks, and the
+    completed files are saved to a checkpoint after each chunk, so an interrupted sync resumes where it stopped.
+"""
+
+# Kept out of the data directory, whose files are all taken as resources (snapshots, `importDirectory`)
+CHECKPOINT_PATH = "api/.sync_checkpoint.json"
+
+def load_checkpoint(path):
+    try:
+        with open(path) as file:
+            return set(json.load(file))
+    except FileNotFoundError:
+        return set()
+
+def save_checkpoint(path, done):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(sorted(done), file)
+    os.replace(temp_path, path)
+
+def sync(api, key, ids, done, args):
+    """
+    Refresh the files of an `api_config` key for the given ids, skipping the ones in the checkpoint.
+    """
+    targets = []
+    for id in ids:
+        meta, file_path = api.teams.getFileInfo(id, key)
+        if file_path not in done:
+            targets.append((file_path, meta))
+
+    start = time.time()
+    outcomes = {"updated": 0, "not_modified": 0, "fresh": 0, "failed": 0}
+    with tqdm(total=len(targets), desc=key) as progress:
+        for i in range(0, len(targets), args.chunk):
+            chunk = targets[i:i + args.chunk]
+            report = api.fileManager.refresh_many(chunk, max_concurrency=args.workers, force=args.force)
+            for file_path, outcome in report.items():
+                outcomes[outcome] += 1
+                if outcome != "failed":
+                    done.add(file_path)
+            save_checkpoint(args.checkpoint, done)
+            progress.update(len(chunk))
+
+    elapsed = time.time() - start
+    requests = outcomes["updated"] + outcomes["not_modified"] + outcomes["failed"]
+    print(f"{key}: {len(ids)} unique, {len(ids) - len(targets)} already synced, {outcomes} "
+          f"in {elapsed:.1f}s ({requests / elapsed if elapsed else 0:.1f} requests/s)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync the season data")
+    parser.add_argument("--workers", type=int, default=5, help="Maximum number of concurrent requests")
+    parser.add_argument("--chunk", type=int, default=50, help="Number of files between checkpoints")
+    parser.add_argument("--force", action="store_true", help="Refresh the files even if they are not stale")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="Path of the checkpoint file")
+    parser.add_argument("--no-compile", action="store_true", help="Don't compile the season store after the sync")
+    parser.add_argument("--backend", choices=["file", "sqlite"], default="file", help="Storage backend of the synced files")
+    args = parser.parse_args()
+
+    api = API()
+    api.setRequestConfig({"max_workers": args.workers})
+    api.setFileConfig({"backend": args.backend})
+    api.init()
+
+    done = load_checkpoint(args.checkpoint)
+    if done:
+        print(f"Resuming sync, {len(done)} files already synced")
+
+    # Weeks -> unique teams
+    weeks = api.teams.getWeekIds()
+    sync(api, "week_matches", weeks, done, args)
+    team_ids = set()
+    for week in weeks:
+        try:
+            for match in api.teams.getWeekMatches(week):
+                team_ids.update([str(match["local"]["id"]), str(match["visitor"]["id"])])
+        except Exception as e:
+            print(f"Error getting week {week} matches: {e}")
+
+    # Teams -> unique players
+    team_ids = sorted(team_ids)
+    sync(api, "team_players", team_ids, done, args)
+    player_ids = set()
+    for team_id in team_ids:
+        try:
+            player_ids.update(str(player["id"]) for player in api.teams.getPlayers(team_id))
+        except Exception as e:
+            print(f"Error getting team {team_id} players: {e}")
+
+    # Players
+    sync(api, "player_stats", sorted(player_ids), done, args)
+
+    if os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    api.fileManager.flush()
+
+    if not args.no_compile:
+        store = api.players.compileStore()
+        print(f"Compiled {store}")
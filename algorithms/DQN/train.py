@@ -1,12 +1,13 @@
 import os
 import numpy as np
 from datetime import datetime
-import matplotlib.pyplot as plt
 
 from environment import Environment
-from DQN.agent import Agent
 
 def train(env: Environment, n_episodes=1000, batch_size=64, target_update=10):
+    import matplotlib.pyplot as plt
+    from DQN.agent import Agent
+
     # Create folder for logs
     folder_name = datetime.now().strftime("%Y%m%d%H%M%S")
     os.makedirs(f"logs/DQN/{folder_name}", exist_ok=True)
@@ -1,10 +1,9 @@
-import torch
-
 from environment import Environment
 from pipeline import Pipeline
-from PPO.agent import PPOAgent
 
 def train(env, agent, num_episodes=1000, max_steps_per_episode=200):
+    import torch
+
     for episode in range(num_episodes):
         obs = env.reset()
         obs = torch.tensor(obs['team'].flatten(), dtype=torch.float32)
@@ -45,11 +44,14 @@ def train(env, agent, num_episodes=1000, max_steps_per_episode=200):
         # Train the agent
         agent.train(trajectory)
 
-# Initialize environment and PPO agent
-env = Environment(pipeline=Pipeline())
-obs_dim = env.observation_space['team'].shape[0] * env.observation_space['team'].shape[1]
-action_dim = env.action_space.n
-agent = PPOAgent(obs_dim, action_dim)
+if __name__ == "__main__":
+    from PPO.agent import PPOAgent
+
+    # Initialize environment and PPO agent
+    env = Environment(pipeline=Pipeline())
+    obs_dim = env.observation_space['team'].shape[0] * env.observation_space['team'].shape[1]
+    action_dim = env.action_space.n
+    agent = PPOAgent(obs_dim, action_dim)
 
-# Train the agent
-train(env, agent)
+    # Train the agent
+    train(env, agent)
@@ -1,7 +1,6 @@
 import os
 import numpy as np
 from datetime import datetime
-import matplotlib.pyplot as plt
 
 from environment import Environment
 
@@ -17,6 +16,8 @@ def select_action(state, w):
     return np.random.choice(len(probs), p=probs)
 
 def train(env: Environment, n_episodes=1000):
+    import matplotlib.pyplot as plt
+
     # Create folder for logs
     folder_name = datetime.now().strftime("%Y%m%d%H%M%S")
     os.makedirs(f"Logs/REINFORCE/{folder_name}", exist_ok=True)
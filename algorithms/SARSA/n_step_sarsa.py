@@ -1,6 +1,6 @@
+from __future__ import annotations
+
 import numpy as np
-import pandas as pd
-import altair as alt
 from tqdm import tqdm
 from typing import Tuple, List
 from itertools import count, product
@@ -159,6 +159,8 @@ class MountainCar:
 
     def run(self, num_episodes: int) -> pd.DataFrame:
         """Runs the algorithm for a given number of episodes."""
+        import pandas as pd
+
         self.initialize()
         results = []
         for i in tqdm(range(num_episodes)):
@@ -178,6 +180,8 @@ class MountainCar:
     def get_est_time_left(self) -> pd.DataFrame:
         """Returns a DataFrame with the cost to go for each state. The cost to go is the negative of the
         max-action-value function. That is, it's the estimated 'cost' of the move to be made."""
+        import pandas as pd
+
         vel_vec, pos_vec = self.get_vel_pos_plot_vecs()
         pos_diff = pos_vec[1] - pos_vec[2] - 0.005
         vel_diff = vel_vec[1] - vel_vec[2] - 0.005
@@ -202,6 +206,7 @@ class MountainCar:
         """
         Plots the position of the car over time for a given episode.
         """
+        import altair as alt
 
         assert self.results is not None, "Must run the TD algorithm first."
         assert episode in self.results["episode"].unique(), "Invalid episode number."
@@ -225,6 +230,8 @@ class MountainCar:
         last episode is plotted.
 
         """
+        import altair as alt
+
         assert self.est_time_left is not None, "Must run the TD algorithm first."
         chart = (
             alt.Chart(
@@ -283,6 +290,8 @@ class MountainCar:
         Plots the number of steps per episode. Since the episode ends when the car reaches the goal, this is a
         measure of the algo's performance as episodes are processed.
         """
+        import altair as alt
+
         return (
             self.results.groupby("episode")
             .size()
@@ -1,7 +1,6 @@
 import os
 import numpy as np
 from datetime import datetime
-import matplotlib.pyplot as plt
 from itertools import count
 
 from environment import Environment
@@ -13,6 +12,8 @@ def select_action(state, w, epsilon, actions):
         return np.argmax(np.dot(np.transpose(w), state))
 
 def train(env: Environment, n_episodes=1000):
+    import matplotlib.pyplot as plt
+
     # Create folder for logs
     folder_name = datetime.now().strftime("%Y%m%d%H%M%S")
     os.makedirs(f"Logs/SARSA/{folder_name}", exist_ok=True)
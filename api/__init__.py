@@ -1 +1 @@
-from main import API
\ No newline at end of file
+from api.main import API
\ No newline at end of file
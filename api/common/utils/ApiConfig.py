@@ -69,4 +69,34 @@ api_config = {
         "fields": ["id", "slug", "players"],
         "base_path": "api/data/absences/"
     },
-}
\ No newline at end of file
+}
+
+# Local stores compiled from the files above
+store_config = {
+    "season_store": {
+        "base_path": "api/data/season_store/"
+    },
+
+    "market_values": {
+        "base_path": "api/data/market_values/"
+    },
+
+    "meta_index": {
+        "base_path": "api/data/meta_index.json"
+    },
+
+    "sqlite": {
+        "base_path": "api/data/fantasy.sqlite3"
+    },
+
+    "snapshot": {
+        "directories": ["api/data/", "api/common/static/"]
+    },
+}
+
+def config_key(file_path):
+    """Return the `api_config` key of a file path, from the base paths, None if no key matches."""
+    for key, config in api_config.items():
+        if file_path.startswith(config["base_path"]):
+            return key
+    return None
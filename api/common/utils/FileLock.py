@@ -0,0 +1,71 @@
+import os, time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+class FileLock:
+    """
+    Exclusive lock on a file, shared by the processes and threads using the same path.
+
+    The lock is taken on a `.lock` file at the given path (`flock` on POSIX, `msvcrt.locking` on Windows), so it
+    is released by the operating system if the process dies. The lock files are never removed, as removing them
+    while another process waits on them would break the mutual exclusion, so the backends keep the locks of
+    their resources in a directory of their own.
+
+    Methods:
+    - `acquire(blocking: bool = True) -> bool`: Takes the lock, returns False if it is held and `blocking` is False.
+    - `release()`: Releases the lock.
+    """
+
+    def __init__(self, path):
+        self.path = path + '.lock'
+        self.file = None
+
+    def acquire(self, blocking=True):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        file = open(self.path, 'a+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            elif msvcrt is not None:
+                file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            raise
+                        time.sleep(0.05)
+        except OSError:
+            file.close()
+            return False
+        self.file = file
+        return True
+
+    def release(self):
+        if self.file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """
+    Least recently used cache with a byte budget.
+
+    Every entry is stored with the size (in bytes) the caller accounts for it, usually the size of the
+    file it was parsed from. When the total size goes over `max_bytes` the least recently used entries
+    are evicted. All the operations are O(1) and thread-safe.
+
+    Attributes:
+    - `max_bytes` (`int`): Maximum number of bytes accounted by the cached entries.
+    - `max_entries` (`int`): Optional maximum number of entries, None for no limit.
+    - `bytes` (`int`): Number of bytes currently accounted by the cached entries.
+    - `hits`, `misses`, `evictions` (`int`): Usage counters.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.lock = threading.RLock()
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def push(self, key, value, size=1):
+        """Add or replace an element, marking it as the most recently used one."""
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.entries.pop(key)[1]
+            if size > self.max_bytes:
+                # Would evict the whole cache and still not fit
+                return False
+            self.entries[key] = (value, size)
+            self.bytes += size
+            self.__evict()
+            return True
+
+    def get(self, key):
+        """Get an element by key, return False if it does not exist."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def delete(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.entries.pop(key)[1]
+            else:
+                raise KeyError(f"Key '{key}' not found in the cache.")
+
+    def resize(self, max_bytes=None, max_entries=None):
+        """Change the cache budget, evicting entries if needed."""
+        with self.lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if max_entries is not None:
+                self.max_entries = max_entries
+            self.__evict()
+
+    def is_empty(self):
+        """Check if the cache is empty."""
+        return not bool(self.entries)
+
+    def clear(self):
+        """Clear the cache, keeping the counters."""
+        with self.lock:
+            self.entries = OrderedDict()
+            self.bytes = 0
+
+    def stats(self):
+        """Return the cache usage counters as a dictionary."""
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    #######################
+    ### PRIVATE METHODS ###
+    #######################
+
+    def __evict(self):
+        while self.entries and (self.bytes > self.max_bytes or (self.max_entries is not None and len(self.entries) > self.max_entries)):
+            _, (_, size) = self.entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
@@ -0,0 +1,142 @@
+import json, time, threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds (in seconds) of the latency histogram buckets, the last bucket holds the slower ones
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets, so recording a value is a binary search and an increment.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket holding it (the maximum for the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(LATENCY_BUCKETS[i], self.max) if i < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+    def toDict(self):
+        buckets = {str(bound): count for bound, count in zip(LATENCY_BUCKETS, self.counts) if count}
+        if self.counts[-1]:
+            buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+class Metrics:
+    """
+    Counters and latency histograms of the api layer, keyed by name and by `api_config` key (e.g. "player_stats").
+
+    Recording is a lock and a dictionary update, cheap enough to be left on, and the whole state can be
+    exported as a dictionary or as JSON.
+
+    Attributes:
+    - `enabled` (`bool`): If False nothing is recorded.
+
+    Methods:
+    - `increment(name: str, key: str = None, value: int = 1)`: Adds a value to a counter.
+    - `observe(name: str, seconds: float, key: str = None)`: Records a latency.
+    - `timer(name: str, key: str = None)`: Context manager recording the latency of its block.
+    - `snapshot() -> dict`: Returns the counters (total and by key) and the latency histograms (by key).
+    - `toJSON(indent: int = None) -> str`: Returns the snapshot as JSON.
+    - `reset()`: Clears the counters and histograms.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def increment(self, name, key=None, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            counter = self.counters.get(name)
+            if counter is None:
+                counter = self.counters[name] = {}
+            counter[key] = counter.get(key, 0) + value
+
+    def observe(self, name, seconds, key=None):
+        if not self.enabled:
+            return
+        with self.lock:
+            histograms = self.histograms.get(name)
+            if histograms is None:
+                histograms = self.histograms[name] = {}
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, key=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, key)
+
+    def snapshot(self):
+        """
+        Get the recorded metrics.
+
+        Returns:
+            dict: `counters` ({name: {"total": int, "keys": {key: int}}}) and `latency` ({name: {key: histogram}},
+                with the count, sum, mean, max, p50, p90 and p99 in seconds and the non-empty buckets).
+                Values recorded without key are listed under "all".
+        """
+        with self.lock:
+            counters = {
+                name: {"total": sum(values.values()), "keys": {self.__key_name(key): value for key, value in values.items()}}
+                for name, values in self.counters.items()
+            }
+            latency = {
+                name: {self.__key_name(key): histogram.toDict() for key, histogram in histograms.items()}
+                for name, histograms in self.histograms.items()
+            }
+        return {"counters": counters, "latency": latency}
+
+    def toJSON(self, indent=None):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+
+    #######################
+    ### PRIVATE METHODS ###
+    #######################
+
+    def __key_name(self, key):
+        return "all" if key is None else str(key)
@@ -0,0 +1,164 @@
+import os, stat, time, pickle, tempfile, threading
+
+class SharedCache:
+    """
+    Cache of parsed payloads shared by the processes of the same machine.
+
+    Every entry is a pickle in a directory of a memory-backed filesystem (`/dev/shm` when available),
+    written atomically and tagged with the version of the file it was parsed from. Processes reading the
+    same files then unpickle the entries instead of decoding the files again, and the entries live once
+    in the page cache whatever the number of processes, so each process can keep a small `LRUCache`.
+
+    Unpickling runs arbitrary code, so the directory must only be writable by the current user: the default one is
+    per user (`/dev/shm/fantasy-rl-<uid>`) and created with mode `0o700`, and the cache refuses a directory owned by
+    another user or open to other users.
+
+    The entries use memory until they are removed, so the directory is bounded by `max_bytes`: it is pruned when
+    the cache is opened and every time a process has pushed a sixteenth of it, removing the oldest written entries.
+
+    Attributes:
+    - `path` (`str`): Directory of the entries.
+    - `max_bytes` (`int`): Maximum size of the entries, in bytes.
+    - `hits`, `misses` (`int`): Usage counters of this process.
+
+    Methods:
+    - `get(key: str, version: str) -> Any`: Returns the value of an entry with the given version, False if there is none.
+    - `push(key: str, value: Any, version: str)`: Adds or replaces an entry.
+    - `delete(key: str)`: Removes an entry.
+    - `clear()`: Removes every entry.
+    - `prune(max_bytes: int = None) -> int`: Removes the oldest entries until the entries fit in `max_bytes`.
+    """
+
+    # Seconds after which a temporary file is considered left by a dead process
+    TEMP_TIMEOUT = 60
+
+    def __init__(self, path=None, namespace="fantasy-rl", max_bytes=256 * 1024 * 1024):
+        if path is None:
+            root = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            path = os.path.join(root, f'{namespace}-{os.getuid()}' if hasattr(os, 'getuid') else namespace)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Bytes pushed by this process since the last prune
+        self.pushed = 0
+        self.lock = threading.Lock()
+        os.makedirs(self.path, mode=0o700, exist_ok=True)
+        self.__check_path()
+        self.prune()
+
+    def get(self, key, version):
+        try:
+            with open(self.__entry_path(key), 'rb') as file:
+                header = file.readline()
+                if header.rstrip(b'\n').decode('utf-8') != version:
+                    self.misses += 1
+                    return False
+                value = pickle.loads(file.read())
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return False
+        self.hits += 1
+        return value
+
+    def push(self, key, value, version):
+        entry_path = self.__entry_path(key)
+        temp_path = f'{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(temp_path, 'wb') as file:
+                file.write(version.encode('utf-8') + b'\n')
+                file.write(raw)
+            os.replace(temp_path, entry_path)
+        except OSError as e:
+            # A full tmpfs only disables the shared cache
+            print(f'SharedCache::push : {str(e)}')
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+        with self.lock:
+            self.pushed += len(raw)
+            prune = self.pushed >= self.max_bytes // 16
+        if prune:
+            self.prune()
+        return True
+
+    def delete(self, key):
+        try:
+            os.remove(self.__entry_path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.path):
+            if name.endswith('.pkl'):
+                self.delete(name[:-4])
+
+    def prune(self, max_bytes=None):
+        """
+        Remove the oldest written entries until the entries use at most `max_bytes`, and the temporary files left by dead processes.
+
+        Args:
+            max_bytes (int, optional): The size to prune to (default is `max_bytes`).
+
+        Returns:
+            int: The number of entries removed.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self.lock:
+            self.pushed = 0
+        entries = []
+        total = 0
+        now = time.time()
+        for entry in os.scandir(self.path):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if entry.name.endswith('.tmp'):
+                if now - stat.st_mtime > self.TEMP_TIMEOUT:
+                    self.__remove(entry.path)
+            elif entry.name.endswith('.pkl'):
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+
+        removed = 0
+        entries.sort()
+        for _, size, entry_path in entries:
+            if total <= max_bytes:
+                break
+            self.__remove(entry_path)
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+    #######################
+    ### PRIVATE METHODS ###
+    #######################
+
+    def __check_path(self):
+        """
+        Raise if the directory of the entries could be written by another user, who could then make this process unpickle anything.
+        """
+        if not hasattr(os, 'getuid'):
+            # No owner or permission bits to check (Windows), the temporary directory is already per user
+            return
+        info = os.lstat(self.path)
+        if not stat.S_ISDIR(info.st_mode):
+            raise Exception(f"The shared cache path is not a directory: {self.path}")
+        if info.st_uid != os.getuid():
+            raise Exception(f"The shared cache directory is owned by another user: {self.path}")
+        if info.st_mode & 0o077:
+            raise Exception(f"The shared cache directory is open to other users (mode {oct(stat.S_IMODE(info.st_mode))}): {self.path}")
+
+    def __entry_path(self, key):
+        return os.path.join(self.path, key + '.pkl')
+
+    def __remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,49 @@
+import threading
+
+class SingleFlight:
+    """
+    Runs a function once per key at a time: the callers that arrive while a call for the same key is in
+    flight wait for it and share its result (or its exception) instead of running the function again.
+
+    Methods:
+    - `do(key: str, function: Callable) -> Tuple[Any, bool]`: Runs the function, or waits for the call in flight, and returns its result and whether it was shared.
+    - `inFlight(key: str) -> bool`: Checks if a call is in flight for a key.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, function):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result, False
+
+    def inFlight(self, key):
+        with self.lock:
+            return key in self.calls
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
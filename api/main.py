@@ -1,3 +1,5 @@
+import json
+
 from api.src.services.BaseService import BaseService
 from api.src.services.PlayersService import PlayersService
 from api.src.services.TeamsService import TeamsService
@@ -5,6 +7,7 @@ from api.src.services.MarketService import MarketService
 
 from api.src.managers.RequestManager import RequestManager
 from api.src.managers.FileManager import FileManager
+from api.common.utils.Metrics import Metrics
 
 class API:
     """
@@ -12,20 +15,64 @@ class API:
     """
     requestManager = None
     fileManager = None
+    metrics = None
 
     players = None
     teams = None
     market = None
 
-    def __init__(self):
-        self.requestManager = RequestManager()
-        self.fileManager = FileManager(self.requestManager)
+    # App config snapshot shared by all the services
+    configSnapshot = None
+
+    def __init__(self, offline=False):
+        # Shared by the managers, see `stats`
+        self.metrics = Metrics()
+        self.requestManager = RequestManager(metrics=self.metrics)
+        self.fileManager = FileManager(self.requestManager, metrics=self.metrics)
+        if offline:
+            # Never fetch, the local files are used even if they are stale
+            self.fileManager.setConfig({"offline": True})
 
     def config(self, requestConfig, fileConfig):
         self.setRequestConfig(requestConfig)
         self.setFileConfig(fileConfig)
 
+    def setRequestConfig(self, config):
+        self.requestManager.setConfig(config)
+
+    def setFileConfig(self, config):
+        self.fileManager.setConfig(config)
+
     def init(self):
         self.players = PlayersService(self)
         self.teams = TeamsService(self)
         self.market = MarketService(self)
+
+    def stats(self, as_json=False):
+        """
+        Get the metrics of the data layer: the cache usage (entries, bytes, hits, misses, evictions), the counters
+        (cache hits and misses, disk reads and writes with their bytes, HTTP requests, 304s, retries and errors,
+        refresh outcomes) and the latency histograms (disk reads and writes, HTTP requests), by `api_config` key.
+
+        Args:
+            as_json (bool, optional): Return the metrics as a JSON string (default is False).
+
+        Returns:
+            dict: The metrics, with `cache`, `counters` and `latency` entries (a JSON string if `as_json` is True).
+        """
+        stats = {"cache": self.fileManager.cache.stats(), **self.metrics.snapshot()}
+        return json.dumps(stats) if as_json else stats
+
+    def resetStats(self):
+        self.metrics.reset()
+
+    def exportSnapshot(self, path, compress=False):
+        return self.fileManager.exportSnapshot(path, compress=compress)
+
+    def importSnapshot(self, path):
+        extracted = self.fileManager.importSnapshot(path)
+        # The services read the new files
+        self.configSnapshot = None
+        if self.players is not None:
+            self.init()
+        return extracted
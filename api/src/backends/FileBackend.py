@@ -0,0 +1,173 @@
+import json, os, hashlib, threading
+
+from api.common.utils.ApiConfig import store_config
+from api.common.utils.FileLock import FileLock
+from api.common.utils.SharedCache import SharedCache
+from ..managers.MetaIndex import MetaIndex
+from .StorageBackend import StorageBackend, encode_content, decode_content
+
+class FileBackend(StorageBackend):
+    """
+    The `FileBackend` class stores every resource in its own file, at the path of the resource.
+
+    Files are replaced atomically (temporary file and `os.replace`), so readers never see a partial file.
+    The meta of every file is kept in a `MetaIndex`, so freshness checks and scans don't parse the files.
+    The refresh locks of the files are kept in a single directory next to the index (`<index path>.locks`),
+    so they don't add a file next to every data file.
+
+    Attributes:
+    - `index` (`MetaIndex`): The metadata index of the files.
+    - `sharedCache` (`SharedCache`): An optional cache of the parsed files, shared by the processes using the same data directory.
+
+    Methods:
+    - `setConfig(config: dict)`: Configures the backend (`storage_format`, `index_path`, `shared_cache` and `shared_cache_size` in bytes).
+    """
+
+    index: MetaIndex = None
+    sharedCache: SharedCache = None
+
+    def __init__(self, index_path=None):
+        self.index = MetaIndex(index_path or store_config["meta_index"]["base_path"])
+
+    def setConfig(self, config):
+        super().setConfig(config)
+        if 'index_path' in config:
+            self.index.save()
+            self.index = MetaIndex(config['index_path'])
+        if 'shared_cache' in config:
+            # True for the default directory, or the directory of the shared cache
+            shared_cache = config['shared_cache']
+            if not shared_cache:
+                self.sharedCache = None
+            elif 'shared_cache_size' in config:
+                self.sharedCache = SharedCache(None if shared_cache is True else shared_cache, max_bytes=config['shared_cache_size'])
+            else:
+                self.sharedCache = SharedCache(None if shared_cache is True else shared_cache)
+        elif 'shared_cache_size' in config and self.sharedCache is not None:
+            self.sharedCache.max_bytes = config['shared_cache_size']
+            self.sharedCache.prune()
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def read(self, path):
+        shared_key = self.__shared_key(path)
+        with open(path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            version = f'{stat.st_size}:{stat.st_mtime_ns}'
+            shared = self.sharedCache.get(shared_key, version) if shared_key else False
+            if shared:
+                file_content, checksum = shared
+            else:
+                raw = file.read()
+
+        if not shared:
+            try:
+                file_content = decode_content(raw)
+            except Exception:
+                raise Exception("Invalid file content")
+            checksum = hashlib.sha256(raw).hexdigest()
+            if shared_key:
+                self.sharedCache.push(shared_key, (file_content, checksum), version)
+
+        if "meta" not in file_content:
+            raise Exception("'meta' not found")
+        if "data" not in file_content:
+            raise Exception("'data' not found")
+
+        meta = file_content["meta"]
+        indexed = self.index.get(path)
+        if indexed is None:
+            self.index.update(path, meta, checksum)
+        elif indexed["last_update"] > meta["last_update"]:
+            # Refreshed with a 304 Not Modified, the index holds the latest meta
+            meta = indexed
+        return file_content["data"], meta, stat.st_size
+
+    def write(self, path, content):
+        raw = encode_content(content, self.storage_format)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        # Write to a temporary file and move it over the target, so readers never see a partial file
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(temp_path, 'wb') as file:
+                file.write(raw)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        checksum = hashlib.sha256(raw).hexdigest()
+        self.index.update(path, content["meta"], checksum)
+        shared_key = self.__shared_key(path)
+        if shared_key:
+            stat = os.stat(path)
+            self.sharedCache.push(shared_key, (content, checksum), f'{stat.st_size}:{stat.st_mtime_ns}')
+        return len(raw)
+
+    def writeMeta(self, path, meta):
+        return self.index.updateMeta(path, meta)
+
+    def getMeta(self, path):
+        return self.index.get(path)
+
+    def size(self, path):
+        return os.path.getsize(path)
+
+    def delete(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+        self.index.delete(path)
+
+    def paths(self, prefix=None):
+        return self.index.paths(prefix)
+
+    def stale(self, prefix=None, now=None):
+        return self.index.stale(prefix, now)
+
+    def importDirectory(self, directory):
+        """
+        Index the JSON files of a directory (recursively) that are not indexed yet or changed on disk.
+        """
+        indexed = 0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                file_path = os.path.join(root, name).replace(os.sep, '/')
+                if not name.endswith('.json') or file_path == self.index.path or self.index.get(file_path) is not None:
+                    continue
+                try:
+                    self.read(file_path)
+                    indexed += 1
+                except Exception as e:
+                    print(f'FileBackend::importDirectory: {str(e)}')
+        self.index.save()
+        return indexed
+
+    def lock(self, path):
+        return FileLock(os.path.join(self.index.path + '.locks', hashlib.sha256(path.encode('utf-8')).hexdigest()))
+
+    def flush(self):
+        self.index.save()
+
+    def reload(self):
+        self.index.load()
+        self.index.revalidate()
+        self.index.save()
+
+    def snapshotEntries(self):
+        # Only the entries that are still valid, their modification times are updated on import
+        entries = {path: entry for path, entry in self.index.entries.items() if self.index.get(path) is not None}
+        return [(self.index.path, json.dumps(entries, separators=(',', ':')).encode('utf-8'))]
+
+    def ignored(self, path):
+        return path == self.index.path or path.startswith(self.index.path + '.locks')
+
+    #######################
+    ### PRIVATE METHODS ###
+    #######################
+
+    def __shared_key(self, path):
+        if self.sharedCache is None:
+            return None
+        return hashlib.sha256(os.path.abspath(path).encode('utf-8')).hexdigest()
@@ -0,0 +1,217 @@
+import json, os, time, sqlite3, hashlib, threading
+from contextlib import contextmanager
+
+from api.common.utils.ApiConfig import store_config, config_key
+from api.common.utils.FileLock import FileLock
+from .StorageBackend import StorageBackend, encode_content, decode_content
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    path TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    id TEXT NOT NULL,
+    last_update INTEGER NOT NULL,
+    update_interval INTEGER NOT NULL,
+    meta TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS resources_key_id ON resources (key, id);
+CREATE INDEX IF NOT EXISTS resources_last_update ON resources (last_update);
+CREATE INDEX IF NOT EXISTS resources_expiry ON resources (last_update + update_interval);
+"""
+
+# Maximum number of parameters of a single query
+MAX_PARAMETERS = 500
+
+class SQLiteBackend(StorageBackend):
+    """
+    The `SQLiteBackend` class stores every resource as a row of a single SQLite database, so a whole
+    season is one file to copy or back up, and scans and bulk reads are queries instead of directory walks.
+
+    Each row holds the path of the resource, its `api_config` key and id, its `last_update` and
+    `update_interval` (indexed, so stale resources are found with an index scan), its meta as JSON and its
+    data encoded with the storage format. The database runs in WAL mode and every thread has its own connection,
+    so readers (in other processes or threads) are never blocked by a refresh, and `batch()` groups the writes
+    of a refresh in a single transaction of the calling thread. Writes of other threads wait for it to commit.
+
+    Attributes:
+    - `path` (`str`): Path of the database file.
+
+    Methods:
+    - `importDirectory(directory: str) -> int`: Imports the JSON files written by the `FileBackend`, in a single transaction.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or store_config["sqlite"]["base_path"]
+        # Guards the list of connections, the connections themselves are only used by the thread that opened them
+        self.mutex = threading.Lock()
+        self.local = threading.local()
+        self.connections = []
+        # Incremented when the connections are closed, so the threads open new ones
+        self.generation = 0
+        self.__connect()
+
+    def exists(self, path):
+        return self.__connection().execute("SELECT 1 FROM resources WHERE path = ?", (path,)).fetchone() is not None
+
+    def read(self, path):
+        row = self.__connection().execute("SELECT meta, data FROM resources WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(path)
+        return decode_content(row[1]), json.loads(row[0]), len(row[1])
+
+    def readMany(self, paths):
+        """
+        Read several resources with one query per `MAX_PARAMETERS` paths.
+        """
+        rows = []
+        paths = list(paths)
+        connection = self.__connection()
+        for i in range(0, len(paths), MAX_PARAMETERS):
+            chunk = paths[i:i + MAX_PARAMETERS]
+            rows.extend(connection.execute(
+                f"SELECT path, meta, data FROM resources WHERE path IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return {path: (decode_content(data), json.loads(meta), len(data)) for path, meta, data in rows}
+
+    def write(self, path, content):
+        meta = content["meta"]
+        raw = encode_content(content["data"], self.storage_format)
+        self.__connection().execute(
+            "INSERT OR REPLACE INTO resources (path, key, id, last_update, update_interval, meta, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, self.__get_key(path), str(meta["id"]), meta["last_update"], meta["update_interval"], json.dumps(meta), raw),
+        )
+        return len(raw)
+
+    def writeMeta(self, path, meta):
+        cursor = self.__connection().execute(
+            "UPDATE resources SET last_update = ?, update_interval = ?, meta = ? WHERE path = ?",
+            (meta["last_update"], meta["update_interval"], json.dumps(meta), path),
+        )
+        return cursor.rowcount > 0
+
+    def getMeta(self, path):
+        row = self.__connection().execute("SELECT meta FROM resources WHERE path = ?", (path,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def size(self, path):
+        row = self.__connection().execute("SELECT length(data) FROM resources WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(path)
+        return row[0]
+
+    def delete(self, path):
+        self.__connection().execute("DELETE FROM resources WHERE path = ?", (path,))
+
+    def paths(self, prefix=None):
+        query, params = self.__prefix_filter(prefix)
+        return [row[0] for row in self.__connection().execute(f"SELECT path FROM resources WHERE {query} ORDER BY path", params)]
+
+    def stale(self, prefix=None, now=None):
+        query, params = self.__prefix_filter(prefix)
+        now = int(time.time()) if now is None else now
+        return [row[0] for row in self.__connection().execute(
+            f"SELECT path FROM resources WHERE last_update + update_interval <= ? AND {query} ORDER BY path", (now, *params)
+        )]
+
+    def importDirectory(self, directory):
+        imported = 0
+        with self.batch():
+            for root, _, files in os.walk(directory):
+                for name in sorted(files):
+                    file_path = os.path.join(root, name).replace(os.sep, '/')
+                    if not name.endswith('.json') or file_path == store_config["meta_index"]["base_path"]:
+                        continue
+                    try:
+                        with open(file_path, 'rb') as file:
+                            content = decode_content(file.read())
+                        if "meta" not in content or "data" not in content:
+                            raise Exception(f"'meta' or 'data' not found in {file_path}")
+                        self.write(file_path, content)
+                        imported += 1
+                    except Exception as e:
+                        print(f'SQLiteBackend::importDirectory: {str(e)}')
+        return imported
+
+    def lock(self, path):
+        return FileLock(os.path.join(self.path + '.locks', hashlib.sha256(path.encode('utf-8')).hexdigest()))
+
+    @contextmanager
+    def batch(self):
+        """
+        Group the writes done inside the block by the calling thread in a single transaction of its connection,
+        nested blocks join the outer one. No lock is held while the block runs (e.g. while a refresh waits for its
+        requests), the other threads keep reading from their own connections.
+        """
+        connection = self.__connection()
+        if self.local.depth == 0:
+            connection.execute("BEGIN IMMEDIATE")
+        self.local.depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.local.depth -= 1
+            if self.local.depth == 0:
+                connection.execute("ROLLBACK")
+            raise
+        self.local.depth -= 1
+        if self.local.depth == 0:
+            connection.execute("COMMIT")
+
+    def flush(self):
+        connection = self.__connection()
+        if self.local.depth == 0:
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        self.flush()
+        with self.mutex:
+            connections = self.connections
+            self.connections = []
+            self.generation += 1
+        for _, connection in connections:
+            connection.close()
+
+    def reload(self):
+        self.close()
+        self.__connect()
+
+    def ignored(self, path):
+        return path.endswith(('-wal', '-shm')) or path.startswith(self.path + '.locks')
+
+    #######################
+    ### PRIVATE METHODS ###
+    #######################
+
+    def __connect(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.__connection().executescript(SCHEMA)
+
+    def __connection(self):
+        """Get the connection of the calling thread, opened on first use."""
+        local = self.local
+        if getattr(local, 'generation', None) != self.generation:
+            # Transactions are handled explicitly (autocommit outside of `batch`), closed by `close` from any thread
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            with self.mutex:
+                # The connections of the threads that ended are closed
+                for thread, other in self.connections:
+                    if not thread.is_alive():
+                        other.close()
+                self.connections = [(thread, other) for thread, other in self.connections if thread.is_alive()]
+                self.connections.append((threading.current_thread(), connection))
+                local.generation = self.generation
+            local.connection = connection
+            local.depth = 0
+        return local.connection
+
+    def __get_key(self, path):
+        return config_key(path) or os.path.dirname(path)
+
+    def __prefix_filter(self, prefix):
+        if not prefix:
+            return "1", ()
+        # Range over the primary key instead of LIKE, which would not use the index
+        return "path >= ? AND path < ?", (prefix, prefix + '\U0010ffff')
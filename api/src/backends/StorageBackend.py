@@ -0,0 +1,140 @@
+import json, gzip, pickle
+from contextlib import nullcontext
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from api.common.utils.FileLock import FileLock
+
+# Encodings of the stored payloads, see `StorageBackend.setConfig`
+STORAGE_FORMATS = ["json", "json-indent", "gzip", "pickle", "msgpack"]
+
+# Pickles start with the PROTO opcode (0x80) and the protocol version, unlike a msgpack map starting with 0x80
+PICKLE_PROTOCOLS = (b'\x02', b'\x03', b'\x04', b'\x05')
+
+def encode_content(content, storage_format="json"):
+    if storage_format == "json":
+        return json.dumps(content, separators=(',', ':')).encode('utf-8')
+    elif storage_format == "json-indent":
+        return json.dumps(content, indent=4).encode('utf-8')
+    elif storage_format == "gzip":
+        return gzip.compress(json.dumps(content, separators=(',', ':')).encode('utf-8'), compresslevel=6)
+    elif storage_format == "pickle":
+        return pickle.dumps(content, protocol=5)
+    elif storage_format == "msgpack":
+        return msgpack.packb(content)
+    raise Exception(f"Invalid storage format: {storage_format}")
+
+def decode_content(raw):
+    # The encoding is detected from the first bytes, so payloads written with different formats can be mixed
+    if raw[:2] == b'\x1f\x8b':
+        return json.loads(gzip.decompress(raw))
+    elif raw[:1] == b'\x80' and raw[1:2] in PICKLE_PROTOCOLS:
+        return pickle.loads(raw)
+    elif raw[:1] and (0x80 <= raw[0] <= 0x9f or 0xdc <= raw[0] <= 0xdf) and msgpack is not None:
+        # A msgpack map or array, of any size (JSON payloads always start with an ASCII byte)
+        return msgpack.unpackb(raw)
+    return json.loads(raw)
+
+class StorageBackend:
+    """
+    The `StorageBackend` class is the interface of the storages behind the `FileManager`.
+
+    Resources are identified by the file path the services build for them (`getFileInfo`), whatever the
+    backend actually stores, and are stored as `{"meta": dict, "data": Any}` contents. The `meta` holds
+    at least the id, name, url, last_update, update_interval and fields of the resource.
+
+    Attributes:
+    - `storage_format` (`str`): The encoding of the stored payloads, one of `STORAGE_FORMATS`.
+
+    Methods:
+    - `exists(path: str) -> bool`: Checks if a resource is stored.
+    - `read(path: str) -> Tuple[Any, dict, int]`: Returns the data, meta and stored size of a resource, raises `FileNotFoundError` if it is not stored.
+    - `readMany(paths: list) -> dict`: Reads several resources, keyed by path, skipping the ones that are not stored.
+    - `write(path: str, content: dict) -> int`: Stores a resource, returns its stored size.
+    - `writeMeta(path: str, meta: dict) -> bool`: Replaces the meta of a stored resource whose data did not change.
+    - `getMeta(path: str) -> dict`: Returns the meta of a resource without reading its data, None if it is not known.
+    - `size(path: str) -> int`: Returns the stored size of a resource.
+    - `delete(path: str)`: Removes a resource.
+    - `paths(prefix: str = None) -> list`: Returns the paths of the stored resources.
+    - `stale(prefix: str = None, now: int = None) -> list`: Returns the paths of the resources whose update interval has expired.
+    - `importDirectory(directory: str) -> int`: Takes over the JSON files of a directory.
+    - `lock(path: str) -> FileLock`: Returns the lock held while refreshing a resource, shared by the processes.
+    - `batch()`: Context manager grouping several writes, committed together when the backend supports it.
+    - `flush()`: Persists the pending state.
+    - `close()` / `reload()`: Releases the storage before its files are replaced, and opens them again.
+    - `snapshotEntries() -> list`: Returns the `(path, bytes)` entries to add to a snapshot archive.
+    - `ignored(path: str) -> bool`: Checks if a file of the data directory must be left out of a snapshot archive.
+    """
+
+    storage_format = "json"
+
+    def setConfig(self, config):
+        if 'storage_format' in config:
+            if config['storage_format'] not in STORAGE_FORMATS:
+                raise Exception(f"Invalid storage format: {config['storage_format']}")
+            if config['storage_format'] == "msgpack" and msgpack is None:
+                raise Exception("The msgpack storage format requires the msgpack package")
+            self.storage_format = config['storage_format']
+
+    def exists(self, path):
+        raise NotImplementedError
+
+    def read(self, path):
+        raise NotImplementedError
+
+    def readMany(self, paths):
+        contents = {}
+        for path in paths:
+            try:
+                contents[path] = self.read(path)
+            except FileNotFoundError:
+                continue
+        return contents
+
+    def write(self, path, content):
+        raise NotImplementedError
+
+    def writeMeta(self, path, meta):
+        raise NotImplementedError
+
+    def getMeta(self, path):
+        raise NotImplementedError
+
+    def size(self, path):
+        raise NotImplementedError
+
+    def delete(self, path):
+        raise NotImplementedError
+
+    def paths(self, prefix=None):
+        raise NotImplementedError
+
+    def stale(self, prefix=None, now=None):
+        raise NotImplementedError
+
+    def importDirectory(self, directory):
+        raise NotImplementedError
+
+    def lock(self, path):
+        return FileLock(path)
+
+    def batch(self):
+        return nullcontext()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def reload(self):
+        pass
+
+    def snapshotEntries(self):
+        return []
+
+    def ignored(self, path):
+        return False
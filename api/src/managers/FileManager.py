@@ -1,8 +1,23 @@
-import json, os, re, time, hashlib
+import io, json, os, re, time, hashlib, tarfile, threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-from api.common.utils.DictStack import DictStack
+from api.common.utils.ApiConfig import api_config, store_config, config_key
+from api.common.utils.LRUCache import LRUCache
+from api.common.utils.Metrics import Metrics
+from api.common.utils.SingleFlight import SingleFlight
+from ..backends.StorageBackend import StorageBackend, STORAGE_FORMATS
+from ..backends.FileBackend import FileBackend
 from .RequestManager import RequestManager
 
+# Returned instead of the new data when the server answers 304 Not Modified
+NOT_MODIFIED = object()
+
+# Storage backends, see `FileManager.setConfig`
+STORAGE_BACKENDS = ["file", "sqlite"]
+
+# What reads do with stale files, see `FileManager.setConfig`
+REFRESH_POLICIES = ["blocking", "background"]
+
 class FileManager:
     """
     The `FileManager` class provides a set of methods for reading, saving, and updating files, with a focus on JSON files.
@@ -10,27 +25,109 @@ class FileManager:
 
     Attributes:
     - `requestManager`: An instance of the `RequestManager` class used for making requests.
+    - `cache`: An `LRUCache` shared by all the instances holding the parsed files, bounded by the size of the files in bytes.
+    - `backend`: The `StorageBackend` storing the files: a `FileBackend` (default, one file per resource with a `MetaIndex`
+      of their metadata) or a `SQLiteBackend` (one database for every resource). Resources are identified by their file
+      path with both backends.
+    - `offline`: If True no request is ever made, stale files are returned as they are and missing files are not created.
+    - `refresh_policy`: "blocking" (default) to refresh stale files before returning them, or "background" to return the
+      stale data at once and refresh the file in a background thread (stale-while-revalidate). Reads only wait for a
+      request when a file was never fetched.
+    - `metrics`: The `Metrics` of the file manager, shared with the `RequestManager` by default. It counts the cache hits and
+      misses, the backend reads and writes with their bytes and latency, the refresh outcomes and the errors, by `api_config` key.
+
+    The encoding of the stored payloads is set with `storage_format`: compact "json" (default), "json-indent", "gzip"
+    (compressed JSON), "pickle" (protocol 5) or "msgpack" (if installed). Reads detect the encoding of each payload from
+    its first bytes, so payloads written with different formats can be mixed.
+
+    Processes can share the data directory: files are replaced atomically, and refreshes take the lock of the backend
+    on the file and check it again once they hold it, so a file refreshed by another process is not requested twice.
+    Within a process, the threads reading the same missing or stale file wait for a single load and refresh (`flights`)
+    and share its result.
 
     Methods:
-    - `read(file_path: str, format: str = "json") -> Any`: Reads and returns the content of a file, with support for different formats.
+    - `read(file_path: str, base_meta: dict, format: str = "json", with_meta: bool = False) -> Any`: Reads and returns the content of a file, with support for different formats.
     - `write(file_path: str, data: Any, meta: dict, format: str = "json")`: Saves data to a file, overwriting the file content or creating a new file.
+    - `readMany(files: list, with_meta: bool = False, refresh: bool = True) -> dict`: Reads several files at once, loading the missing ones from the backend in bulk.
+    - `setConfig(config: dict)`: Configures the file manager (`cache_size` in bytes, `cache_entries`, `offline`, `refresh_policy`,
+      `refresh_workers`, `backend` and `backend_path`) and its backend (`storage_format`, plus `index_path`, `shared_cache` and `shared_cache_size` for the `FileBackend`).
+    - `getStale(prefix: str = None) -> list`: Returns the managed files whose update interval has expired, from the backend metadata.
+    - `getMeta(file_path: str) -> dict`: Returns the stored meta of a file without reading its data.
+    - `getChangeCount(key: str = None) -> int`: Returns the number of files written or refreshed through the file manager.
+    - `warmup(prefix: str = None) -> int`: Loads the fresh stored files into the cache.
+    - `indexFiles(directory: str) -> int`: Indexes (or imports into the database) the JSON files of a directory.
+    - `rewrite(prefix: str = None) -> int`: Rewrites the stored files with the current storage format.
+    - `batch()`: Context manager grouping the writes done inside it in a single transaction, when the backend supports it.
+    - `flush()`: Persists the pending state of the backend.
+    - `exportSnapshot(path: str, directories: list = None, compress: bool = False) -> int`: Archives the data and static files in a single file.
+    - `importSnapshot(path: str, directory: str = ".") -> int`: Extracts a snapshot archive and reloads the backend.
+    - `refresh_many(paths_or_keys: list, max_concurrency: int = None, force: bool = False) -> dict`: Refreshes the stale files concurrently.
+    - `waitRefreshes(timeout: float = None) -> bool`: Waits for the background refreshes scheduled so far.
     
     Private Methods:
     - `__update_data(meta: dict) -> Tuple[dict, Any]`: Updates the file data from a specified URL and returns the updated data and metadata.
-    - `__check_path_recursive(path: str, format: str = "json")`: Recursively checks and creates directories for the given file path.
+    - `__check_resource(path: str, meta: dict)`: Stores a placeholder for a file that does not exist yet.
     """
 
-    cache = DictStack(150)
+    cache = LRUCache(64 * 1024 * 1024)
+    # Loads and refreshes in flight, shared like the cache
+    flights = SingleFlight()
 
     requestManager: RequestManager = None
+    backend: StorageBackend = None
+    offline = False
+    refresh_policy = "blocking"
+    refresh_workers = 2
 
-    def __init__(self, requestManager: RequestManager):
+    def __init__(self, requestManager: RequestManager, index_path=None, metrics: Metrics = None):
         self.requestManager = requestManager
+        self.backend = FileBackend(index_path)
+        self.metrics = metrics or getattr(requestManager, 'metrics', None) or Metrics()
+        # Background refreshes, keyed by file path so a file is only scheduled once
+        self.refreshes = {}
+        self.refreshesLock = threading.Lock()
+        self.refresher = None
+        # Number of files written or refreshed, by `api_config` key
+        self.changes = {}
+        self.changesLock = threading.Lock()
 
-    def setConfig():
-        pass
+    def setConfig(self, config):
+        # Checked before anything changes, so an invalid format doesn't leave a new backend half configured
+        if 'storage_format' in config and config['storage_format'] not in STORAGE_FORMATS:
+            raise Exception(f"Invalid storage format: {config['storage_format']}")
+        if 'cache_size' in config or 'cache_entries' in config:
+            self.cache.resize(config.get('cache_size'), config.get('cache_entries'))
+        if 'offline' in config:
+            self.offline = bool(config['offline'])
+        if 'refresh_policy' in config:
+            if config['refresh_policy'] not in REFRESH_POLICIES:
+                raise Exception(f"Invalid refresh policy: {config['refresh_policy']}")
+            self.refresh_policy = config['refresh_policy']
+        if 'refresh_workers' in config:
+            refresh_workers = max(1, int(config['refresh_workers']))
+            with self.refreshesLock:
+                if self.refresher is not None and refresh_workers != self.refresh_workers:
+                    # The refreshes already scheduled still run on the previous executor
+                    self.refresher.shutdown(wait=False)
+                    self.refresher = None
+                self.refresh_workers = refresh_workers
+        if 'backend' in config or 'backend_path' in config:
+            # Only moving the storage (`backend_path`) keeps the current backend
+            name = config.get('backend', 'file' if isinstance(self.backend, FileBackend) else 'sqlite')
+            if name not in STORAGE_BACKENDS:
+                raise Exception(f"Invalid storage backend: {name}")
+            self.backend.close()
+            if name == "sqlite":
+                # Imported on first use, so that sqlite3 is only loaded by the processes using it
+                from ..backends.SQLiteBackend import SQLiteBackend
+                self.backend = SQLiteBackend(config.get('backend_path'))
+            else:
+                self.backend = FileBackend(config.get('backend_path'))
+            # The cached files may come from the previous backend
+            self.cache.clear()
+        self.backend.setConfig(config)
 
-    def read(self, file_path, base_meta, format="json"):
+    def read(self, file_path, base_meta, format="json", with_meta=False):
         """
         Reads and returns the content of a file, with support for different formats.
 
@@ -38,9 +135,10 @@ class FileManager:
             file_path (str): The path to the file to read.
              meta (dict): Metadata associated with the file.
             format (str, optional): The format of the file (default is "json").
+            with_meta (bool, optional): Also return the metadata of the file (default is False).
 
         Returns:
-            Any: The content of the file.
+            Any: The content of the file, or a `(data, meta)` tuple if `with_meta` is True.
         """
 
         # Check if the parent directory exists and create it if necessary
@@ -49,65 +147,35 @@ class FileManager:
         # This can be done in the same class or by the services themselves
         
         # ALERT: this meta is only used for the first write/read
-        self.__check_path_recursive(file_path, base_meta)
-        hashed_file_path = self.hash_file_path(file_path)
+        if self.offline and not self.backend.exists(file_path):
+            print(f'FileManager::Read: {file_path} is not available offline')
+            return (None, None) if with_meta else None
+        key = config_key(file_path)
         try:
             if format == "json":
-                meta = None
-                data = None
-                
-                cached = self.cache.get(hashed_file_path)
-                if cached:
-                    data = cached['data']
-                    meta = cached['meta']
+                cached = self.cache.get(self.hash_file_path(file_path))
+                if cached and (self.offline or not self.__is_stale(cached['meta'])):
+                    self.metrics.increment('cache.hits', key)
+                    data, meta = cached['data'], cached['meta']
+                elif cached and self.__serves_stale(cached['meta']):
+                    self.metrics.increment('cache.stale_hits', key)
+                    self.__schedule_refresh(file_path, base_meta, key)
+                    data, meta = cached['data'], cached['meta']
                 else:
-                    with open(file_path, 'a+') as file:
-                        file.seek(0)
-                        
-                        try:
-                            file_content = json.load(file)
-                        except json.decoder.JSONDecodeError:
-                            raise Exception("Invalid JSON file")
-
-                        if "meta" not in file_content:
-                            raise Exception("'meta' not found")
-                        if "data" not in file_content:
-                            raise Exception("'data' not found")
-
-                        meta = file_content["meta"]
-                        data = file_content["data"]
-
-                required_metadata_fields = ["id", "name", "url", "last_update", "update_interval", "fields"]
-                missing_fields = [field for field in required_metadata_fields if field not in meta]
-                if missing_fields:
-                    raise Exception(f"Missing required metadata fields: {', '.join(missing_fields)}")
-
-                id = meta["id"]
-                current_time = int(time.time())
-                last_update = meta["last_update"]
-                update_interval = meta["update_interval"]
-
-                if current_time - last_update >= update_interval:
-                    new_data, new_meta = self.__update_data(data, meta)
-                    if new_data is not None and new_meta is not None:
-                        # Update the file and cache with the updated data and metadata
-                        succes = self.write(new_data, file_path, new_meta, format="json")
-                        if not succes:
-                            raise Exception(f"Error writing updated file with id {id}")
-                        self.cache.push(hashed_file_path, {"data": new_data, "meta": new_meta})
-                        return new_data
-                    else:
-                        raise Exception(f"Error updating file with id {id}")
-                if data is not None and meta is not None:
-                    return data
-                else: 
-                    raise Exception(f"Error reading file with id {id}")
+                    # The readers of the same missing or stale file wait for a single load and refresh
+                    (data, meta), shared = self.flights.do(file_path, lambda: self.__load(file_path, base_meta, key, cached))
+                    if shared:
+                        self.metrics.increment('read.coalesced', key)
+                return (data, meta) if with_meta else data
             else:
+                self.__check_resource(file_path, base_meta)
                 with open(file_path, 'r') as file:
-                    return file.read()
+                    content = file.read()
+                    return (content, None) if with_meta else content
         except Exception as e:
+            self.metrics.increment('errors', key)
             print(f'FileManager::Read: {str(e)}')
-            return None
+            return (None, None) if with_meta else None
 
     def write(self, data, file_path, meta, format="json"):
         """
@@ -119,14 +187,12 @@ class FileManager:
             meta (dict): Metadata associated with the data.
             format (str, optional): The format of the file (default is "json").
         """
-        # Check if the parent directory exists and create it if necessary
-        self.__check_path_recursive(file_path, meta)
-
         # Ensure that required metadata fields are provided
         required_fields = ["id", "name", "url", "last_update", "update_interval", "fields"]
         if not all(field in meta for field in required_fields):
             raise Exception("Missing required metadata fields")
 
+        key = config_key(file_path)
         try:
             if format == "json":
                 if isinstance(data, dict):
@@ -136,8 +202,7 @@ class FileManager:
                     new_data = {"meta": meta, "data": data}
 
                     # Write the updated JSON data to the file
-                    with open(file_path, 'w+') as file:
-                        json.dump(new_data, file, indent=4)
+                    self.__write_backend(file_path, new_data, key)
                     return True
                 elif isinstance(data, list):
                     new = []
@@ -149,31 +214,479 @@ class FileManager:
                     new_data = {"meta": meta, "data": new}
 
                     # Write the updated JSON data to the file
-                    with open(file_path, 'w+') as file:
-                        json.dump(new_data, file, indent=4)
+                    self.__write_backend(file_path, new_data, key)
                     return True
                 else:
                     raise Exception("Cannot update JSON data with invalid format")
             else:
+                # Check if the parent directory exists and create it if necessary
+                os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
                 with open(file_path, 'w+') as file:
                     file.write(data)
                 return True
         except Exception as e:
+            self.metrics.increment('errors', key)
             print(f'FileManager::write : {str(e)}')
             return False        
     
+    def readMany(self, files, with_meta=False, refresh=True):
+        """
+        Read several files at once. The cached files are taken from the cache, the stale or missing ones are
+        refreshed with `refresh_many` (unless offline) and the others are loaded from the backend in bulk
+        (a single query with the `SQLiteBackend`).
+
+        Args:
+            files (list): `(file_path, base_meta)` tuples, as returned by the `getFileInfo` method of the services.
+            with_meta (bool, optional): Return `(data, meta)` tuples (default is False).
+            refresh (bool, optional): Refresh the stale or missing files (default is True). If False, the stored
+                files are read from the backend as they are (their cached version is replaced) and never requested.
+
+        Returns:
+            dict: The content of each file keyed by path, None for the files that could not be read.
+        """
+        contents = {}
+        missing = []
+        for file_path, base_meta in files:
+            cached = self.cache.get(self.hash_file_path(file_path)) if refresh else None
+            if not refresh:
+                missing.append((file_path, base_meta))
+            elif cached and (self.offline or not self.__is_stale(cached['meta'])):
+                self.metrics.increment('cache.hits', config_key(file_path))
+                contents[file_path] = cached
+            elif cached and self.__serves_stale(cached['meta']):
+                self.metrics.increment('cache.stale_hits', config_key(file_path))
+                self.__schedule_refresh(file_path, base_meta, config_key(file_path))
+                contents[file_path] = cached
+            else:
+                self.metrics.increment('cache.misses', config_key(file_path))
+                missing.append((file_path, base_meta))
+
+        if missing:
+            if refresh and not self.offline:
+                blocking = []
+                for file_path, base_meta in missing:
+                    meta = self.__get_meta(file_path)
+                    if meta is not None and self.__is_stale(meta) and self.__serves_stale(meta):
+                        # The stored data is returned, refreshed in the background
+                        self.__schedule_refresh(file_path, base_meta, config_key(file_path))
+                    else:
+                        blocking.append((file_path, base_meta))
+                self.refresh_many(blocking)
+            with self.metrics.timer('disk.read_many'):
+                loaded = self.backend.readMany([file_path for file_path, _ in missing])
+            for file_path, (data, meta, size) in loaded.items():
+                key = config_key(file_path)
+                self.metrics.increment('disk.reads', key)
+                self.metrics.increment('disk.bytes_read', key, size)
+                contents[file_path] = {"data": data, "meta": meta}
+                self.cache.push(self.hash_file_path(file_path), contents[file_path], size)
+
+        result = {}
+        for file_path, _ in files:
+            content = contents.get(file_path)
+            if content is None:
+                result[file_path] = (None, None) if with_meta else None
+            else:
+                result[file_path] = (content['data'], content['meta']) if with_meta else content['data']
+        return result
+
+    def getStale(self, prefix=None):
+        """
+        Get the managed files whose update interval has expired. Only the metadata of the backend is used,
+        so scanning thousands of files takes milliseconds.
+
+        Args:
+            prefix (str, optional): Only consider the files whose path starts with this prefix (e.g. a `base_path`).
+
+        Returns:
+            list: The paths of the stale files.
+        """
+        return self.backend.stale(prefix)
+
+    def getMeta(self, file_path):
+        """
+        Get the stored meta of a file without reading its data (unless the backend does not know it yet).
+
+        Args:
+            file_path (str): The path of the file.
+
+        Returns:
+            dict: The meta of the file, None if the file is not stored.
+        """
+        return self.__get_meta(file_path)
+
+    def getChangeCount(self, key=None):
+        """
+        Get the number of files written or refreshed (304 included) through this file manager, so that data derived
+        from the files can be checked again only when it changed.
+
+        Args:
+            key (str, optional): Only count the files of this `api_config` key (default is every file).
+
+        Returns:
+            int: The number of changes.
+        """
+        with self.changesLock:
+            return sum(self.changes.values()) if key is None else self.changes.get(key, 0)
+
+    def warmup(self, prefix=None):
+        """
+        Load the fresh stored files into the cache, until the cache budget is used.
+
+        Args:
+            prefix (str, optional): Only consider the files whose path starts with this prefix.
+
+        Returns:
+            int: The number of files loaded.
+        """
+        stale = set(self.backend.stale(prefix))
+        file_paths = [
+            file_path for file_path in self.backend.paths(prefix)
+            if file_path not in stale and self.hash_file_path(file_path) not in self.cache
+        ]
+        loaded = 0
+        for i in range(0, len(file_paths), 100):
+            try:
+                contents = self.backend.readMany(file_paths[i:i + 100])
+            except Exception as e:
+                print(f'FileManager::warmup: {str(e)}')
+                continue
+            for file_path, (data, meta, size) in contents.items():
+                if self.cache.bytes + size > self.cache.max_bytes:
+                    return loaded
+                self.cache.push(self.hash_file_path(file_path), {"data": data, "meta": meta}, size)
+                loaded += 1
+        return loaded
+
+    def indexFiles(self, directory):
+        """
+        Index the JSON files of a directory (recursively) that are not indexed yet or changed on disk.
+        With the `SQLiteBackend` the files are imported into the database.
+
+        Args:
+            directory (str): The directory to scan.
+
+        Returns:
+            int: The number of files indexed.
+        """
+        return self.backend.importDirectory(directory)
+
+    def refresh_many(self, paths_or_keys, max_concurrency=None, force=False):
+        """
+        Refresh several files concurrently. The stale files are fetched through the `RequestManager`
+        executor, keeping up to `max_concurrency` requests in flight, and each file is written as soon as
+        its request completes.
+
+        Args:
+            paths_or_keys (list): File paths, `api_config` keys (every stored file of that key) or
+                `(file_path, meta)` tuples for files that may not exist yet.
+            max_concurrency (int, optional): Maximum number of requests in flight (default is the number of
+                `RequestManager` workers, which also bounds the actual concurrency).
+            force (bool, optional): Refresh the files even if they are not stale (default is False).
+
+        Returns:
+            dict: The outcome of each file, keyed by path: "updated", "not_modified", "fresh" or "failed"
+                (stale files are never requested in offline mode and fail). The files refreshed without
+                waiting for another process are written in a single backend batch.
+        """
+        report = {}
+        targets = []
+        for file_path, meta in self.__resolve_targets(paths_or_keys):
+            if meta is None:
+                report[file_path] = "failed"
+            elif not force and not self.__is_stale(meta):
+                report[file_path] = "fresh"
+            elif self.offline:
+                report[file_path] = "failed"
+            else:
+                targets.append((file_path, meta))
+
+        max_concurrency = max(1, max_concurrency or self.requestManager.max_workers)
+        targets.reverse()
+        pending = {}
+        contended = []
+        with self.backend.batch():
+            while targets or pending:
+                while targets and len(pending) < max_concurrency:
+                    file_path, meta = targets.pop()
+                    lock = self.backend.lock(file_path)
+                    if not lock.acquire(blocking=False):
+                        # Being refreshed by another process, checked again once it is done
+                        contended.append((file_path, meta))
+                        continue
+                    if not force and self.__refreshed_elsewhere(file_path):
+                        lock.release()
+                        report[file_path] = "fresh"
+                        continue
+                    request = self.__start_update(meta, config_key(file_path))
+                    if request is None:
+                        lock.release()
+                        report[file_path] = "failed"
+                    else:
+                        pending[request] = (file_path, meta, lock)
+                if not pending:
+                    continue
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for request in done:
+                    file_path, meta, lock = pending.pop(request)
+                    try:
+                        report[file_path] = self.__finish_refresh(file_path, request, meta)
+                    finally:
+                        lock.release()
+
+        # Outside of the batch, the other process may be waiting to write them
+        for file_path, meta in contended:
+            with self.backend.lock(file_path):
+                if self.__refreshed_elsewhere(file_path):
+                    report[file_path] = "fresh"
+                else:
+                    report[file_path] = self.__finish_refresh(file_path, self.__start_update(meta, config_key(file_path)), meta)
+
+        self.backend.flush()
+        for file_path, outcome in report.items():
+            self.metrics.increment('refresh.' + outcome, config_key(file_path))
+        return report
+
+    def waitRefreshes(self, timeout=None):
+        """
+        Wait for the background refreshes scheduled so far (with the "background" refresh policy).
+
+        Args:
+            timeout (float, optional): The maximum number of seconds to wait, None to wait until they are done.
+
+        Returns:
+            bool: True if every refresh is done.
+        """
+        with self.refreshesLock:
+            pending = list(self.refreshes.values())
+        _, not_done = wait(pending, timeout=timeout)
+        return not not_done
+
+    def rewrite(self, prefix=None):
+        """
+        Rewrite the stored files with the current storage format.
+
+        Args:
+            prefix (str, optional): Only consider the files whose path starts with this prefix.
+
+        Returns:
+            int: The number of files rewritten.
+        """
+        rewritten = 0
+        with self.backend.batch():
+            for file_path in self.backend.paths(prefix):
+                try:
+                    data, meta, _ = self.backend.read(file_path)
+                    self.backend.write(file_path, {"meta": meta, "data": data})
+                    rewritten += 1
+                except Exception as e:
+                    print(f'FileManager::rewrite: {str(e)}')
+        self.backend.flush()
+        return rewritten
+
+    def batch(self):
+        """
+        Group the writes done inside the block in a single transaction of the backend (e.g. several
+        `refresh_many` calls), nothing is grouped with the `FileBackend`.
+        """
+        return self.backend.batch()
+
+    def flush(self):
+        """
+        Persist the pending state of the backend (the metadata index of the `FileBackend`).
+        """
+        self.backend.flush()
+
+    def exportSnapshot(self, path, directories=None, compress=False):
+        """
+        Archive the data and static files in a single tar file, so that a node without network access
+        can be provisioned with one copy. The archive is written as a stream, and the backend adds its own
+        entries (the metadata index of the files that are unchanged on disk), so they are still valid after import.
+
+        Args:
+            path (str): The path of the archive.
+            directories (list, optional): The directories to archive (default is `store_config["snapshot"]["directories"]`).
+            compress (bool, optional): Compress the archive with gzip (default is False, which is faster to load).
+
+        Returns:
+            int: The number of files archived.
+        """
+        directories = directories or store_config["snapshot"]["directories"]
+        self.backend.flush()
+        archived = 0
+        with tarfile.open(path, "w|gz" if compress else "w|") as archive:
+            for directory in directories:
+                for root, _, files in os.walk(directory):
+                    for name in sorted(files):
+                        file_path = os.path.join(root, name).replace(os.sep, '/')
+                        if name.endswith(('.tmp', '.lock')) or self.backend.ignored(file_path) or os.path.abspath(file_path) == os.path.abspath(path):
+                            continue
+                        archive.add(file_path, recursive=False)
+                        archived += 1
+
+            for name, raw in self.backend.snapshotEntries():
+                info = tarfile.TarInfo(name)
+                info.size = len(raw)
+                info.mtime = int(time.time())
+                archive.addfile(info, io.BytesIO(raw))
+        return archived
+
+    def importSnapshot(self, path, directory="."):
+        """
+        Extract a snapshot archive created by `exportSnapshot` and reload the backend and the cache.
+        The archive is read sequentially, compressed or not.
+
+        Args:
+            path (str): The path of the archive.
+            directory (str, optional): The directory where the archive is extracted (default is the working directory).
+
+        Returns:
+            int: The number of files extracted.
+        """
+        # The files of the backend are replaced
+        self.backend.close()
+        extracted = 0
+        with tarfile.open(path, "r|*") as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                if hasattr(tarfile, 'data_filter'):
+                    archive.extract(member, directory, filter='data')
+                elif os.path.isabs(member.name) or '..' in member.name.split('/'):
+                    raise Exception(f"Invalid path in snapshot: {member.name}")
+                else:
+                    archive.extract(member, directory)
+                extracted += 1
+
+        self.backend.reload()
+        self.cache.clear()
+        return extracted
+
     #######################
     ### PRIVATE METHODS ###
     #######################
 
-    def __update_data(self, data, meta):
+    def __load(self, file_path, base_meta, key, cached, serve_stale=True):
+        """
+        Read a file that is not cached or stale from the backend, refreshing it if needed, return its data and meta.
+        With the "background" refresh policy (and `serve_stale`), stale data is returned and the refresh is scheduled.
+        """
+        self.__check_resource(file_path, base_meta)
+        hashed_file_path = self.hash_file_path(file_path)
+        meta = None
+        data = None
+
+        if cached:
+            self.metrics.increment('cache.hits', key)
+            data = cached['data']
+            meta = cached['meta']
+        else:
+            self.metrics.increment('cache.misses', key)
+            # The backend metadata tells if the file is stale, in which case there is no need to parse it
+            meta = self.backend.getMeta(file_path)
+            if meta is None or self.offline or not self.__is_stale(meta) or (serve_stale and self.__serves_stale(meta)):
+                data, meta, size = self.__read_backend(file_path, key)
+
+        required_metadata_fields = ["id", "name", "url", "last_update", "update_interval", "fields"]
+        missing_fields = [field for field in required_metadata_fields if field not in meta]
+        if missing_fields:
+            raise Exception(f"Missing required metadata fields: {', '.join(missing_fields)}")
+
+        id = meta["id"]
+        if not self.offline and self.__is_stale(meta) and serve_stale and data is not None and self.__serves_stale(meta):
+            self.__schedule_refresh(file_path, base_meta, key)
+        elif not self.offline and self.__is_stale(meta):
+            with self.backend.lock(file_path):
+                if self.__refreshed_elsewhere(file_path):
+                    data, meta, size = self.__read_backend(file_path, key)
+                    cached = False
+                else:
+                    new_data, new_meta = self.__update_data(data, meta, key)
+                    modified = new_data is not NOT_MODIFIED
+                    if not modified:
+                        # The stored data is still valid, only the metadata is updated
+                        new_data = data if data is not None else self.__read_backend(file_path, key)[0]
+                    if new_data is not None and new_meta is not None:
+                        # Update the file and cache with the updated data and metadata
+                        if not self.__store_update(file_path, new_data, new_meta, modified=modified):
+                            raise Exception(f"Error writing updated file with id {id}")
+                        self.metrics.increment('refresh.updated' if modified else 'refresh.not_modified', key)
+                        return new_data, new_meta
+                    else:
+                        self.metrics.increment('refresh.failed', key)
+                        raise Exception(f"Error updating file with id {id}")
+        if data is not None and meta is not None:
+            if not cached:
+                self.cache.push(hashed_file_path, {"data": data, "meta": meta}, size)
+            return data, meta
+        else:
+            raise Exception(f"Error reading file with id {id}")
+
+    def __serves_stale(self, meta):
+        """Check if the stale data of a file can be returned while it is refreshed, it must have been fetched once."""
+        return self.refresh_policy == "background" and not self.offline and meta.get("last_update", 0) > 0
+
+    def __schedule_refresh(self, file_path, base_meta, key):
+        """Refresh a file in the background, unless its refresh is already scheduled."""
+        with self.refreshesLock:
+            if file_path in self.refreshes:
+                return
+            if self.refresher is None:
+                self.refresher = ThreadPoolExecutor(max_workers=self.refresh_workers, thread_name_prefix="FileManager-refresh")
+            self.metrics.increment('refresh.scheduled', key)
+            self.refreshes[file_path] = self.refresher.submit(self.__background_refresh, file_path, base_meta, key)
+
+    def __background_refresh(self, file_path, base_meta, key):
+        try:
+            self.__load(file_path, base_meta, key, False, serve_stale=False)
+        except Exception as e:
+            self.metrics.increment('errors', key)
+            print(f'FileManager::__background_refresh: {str(e)}')
+        finally:
+            with self.refreshesLock:
+                self.refreshes.pop(file_path, None)
+
+    def __is_stale(self, meta):
+        return int(time.time()) - meta["last_update"] >= meta["update_interval"]
+
+    def __refreshed_elsewhere(self, file_path):
+        """Check if a file was refreshed by another process, while this one waited for its lock."""
+        meta = self.__get_meta(file_path)
+        return meta is not None and not self.__is_stale(meta)
+
+    def __finish_refresh(self, file_path, request, meta):
+        """Complete a refresh started with `__start_update` and store the result, return its outcome."""
+        new_data, new_meta = self.__complete_update(request, meta)
+        if new_data is NOT_MODIFIED:
+            updated = self.__store_update(file_path, self.__cached_data(file_path), new_meta, cache=False, modified=False)
+            return "not_modified" if updated else "failed"
+        updated = self.__store_update(file_path, new_data, new_meta, cache=False)
+        return "updated" if updated else "failed"
+
+    def __update_data(self, data, meta, key=None):
+        return self.__complete_update(self.__start_update(meta, key), meta)
+
+    def __start_update(self, meta, key=None):
+        """Start fetching the new data of a file, returns the request future (None if the URL is invalid)."""
+        if not re.search(r'^https?://', meta["url"]):
+            print('FileManager::__update_data: Invalid URL')
+            return None
+        headers = self.requestManager.conditionalHeaders(meta.get("etag"), meta.get("last_modified"))
+        return self.requestManager.get(meta["url"], headers=headers, timeout=5, key=key)
+
+    def __complete_update(self, request, meta):
+        """Wait for a request started by `__start_update` and return the new data and metadata."""
         try:
-            if not re.search(r'^https?://', meta["url"]) and not re.search(r'^http?://', meta["url"]):
+            if request is None:
                 raise Exception("Invalid URL")
-            
-            new_data = self.requestManager.get(meta["url"], timeout=5)
-            new_data = new_data.result()
-            new_data = json.loads(new_data.text)
+            response = request.result()
+            if response is None:
+                raise Exception("Request failed")
+            if response.status_code == 304:
+                meta["last_update"] = int(time.time())
+                return NOT_MODIFIED, meta
+            new_data = json.loads(response.text)
 
             # Update data
             if isinstance(new_data, dict):
@@ -191,33 +704,85 @@ class FileManager:
                 
             # Update metada 
             meta["last_update"] = int(time.time())
+            if response.headers.get("ETag"):
+                meta["etag"] = response.headers["ETag"]
+            if response.headers.get("Last-Modified"):
+                meta["last_modified"] = response.headers["Last-Modified"]
 
             return data, meta
         except Exception as e:
             print(f'FileManager::__update_data: {str(e)}')
             return None, None
 
-    def __check_path_recursive(self, path, meta=None, format="json"):
-        if not os.path.exists(path):
-            parent_directory = os.path.dirname(path)
-            self.__check_path_recursive(parent_directory)
-            isfile = re.search(r'\.[A-Za-z0-9]+$', path)
-            if not isfile:
-                os.makedirs(path + '/', mode=0o777, exist_ok=True)
-            elif isfile:
-                if format == "json":
-                    with open(path, 'x') as file:
-                        if meta:
-                            default = { "meta": meta, "data": {}}
-                        else:
-                            raise Exception("Missing required metadata fields")
-                        json.dump(default, file, indent=4)
-                else:
-                    with open(path, 'x') as file:
-                        pass
+    def __read_backend(self, file_path, key):
+        """Read a file from the backend, recording the read, its size and its latency."""
+        with self.metrics.timer('disk.read', key):
+            data, meta, size = self.backend.read(file_path)
+        self.metrics.increment('disk.reads', key)
+        self.metrics.increment('disk.bytes_read', key, size)
+        return data, meta, size
+
+    def __write_backend(self, file_path, content, key):
+        """Write a file to the backend, recording the write, its size and its latency."""
+        with self.metrics.timer('disk.write', key):
+            size = self.backend.write(file_path, content)
+        self.metrics.increment('disk.writes', key)
+        self.__count_change(key)
+        self.metrics.increment('disk.bytes_written', key, size or 0)
+        return size
+
+    def __store_update(self, file_path, data, meta, cache=True, modified=True):
+        """Write the updated data of a file (only its stored meta if not modified) and update the cache, return True if it succeeded."""
+        if data is None or meta is None:
+            return False
+        if modified:
+            if not self.write(data, file_path, meta, format="json"):
+                return False
+        elif not self.backend.writeMeta(file_path, meta):
+            return False
         else:
+            self.__count_change(config_key(file_path))
+        hashed_file_path = self.hash_file_path(file_path)
+        if cache or hashed_file_path in self.cache:
+            self.cache.push(hashed_file_path, {"data": data, "meta": meta}, self.backend.size(file_path))
+        return True
+
+    def __count_change(self, key):
+        with self.changesLock:
+            self.changes[key] = self.changes.get(key, 0) + 1
+
+    def __cached_data(self, file_path):
+        cached = self.cache.get(self.hash_file_path(file_path))
+        return cached['data'] if cached else {}
+
+    def __get_meta(self, file_path):
+        meta = self.backend.getMeta(file_path)
+        if meta is None and self.backend.exists(file_path):
+            try:
+                _, meta, _ = self.backend.read(file_path)
+            except Exception as e:
+                print(f'FileManager::__get_meta: {str(e)}')
+        return meta
+
+    def __resolve_targets(self, paths_or_keys):
+        for item in paths_or_keys:
+            if isinstance(item, tuple):
+                file_path, base_meta = item
+                yield file_path, self.__get_meta(file_path) or dict(base_meta)
+            elif item in api_config:
+                for file_path in self.backend.paths(api_config[item]["base_path"]):
+                    yield file_path, self.__get_meta(file_path)
+            else:
+                yield item, self.__get_meta(item)
+
+    def __check_resource(self, file_path, meta):
+        if self.backend.exists(file_path):
             return
-    
+        if not meta:
+            raise Exception("Missing required metadata fields")
+        # Placeholder, stale until its first refresh
+        self.backend.write(file_path, {"meta": meta, "data": {}})
+
     def hash_file_path(self, file_path):
         sha256 = hashlib.sha256()
         sha256.update(file_path.encode('utf-8'))
@@ -0,0 +1,183 @@
+import json, os, time, atexit, threading
+
+from api.common.utils.FileLock import FileLock
+
+class MetaIndex:
+    """
+    The `MetaIndex` class keeps the metadata of every file managed by the `FileManager` in a single small
+    JSON file, so that freshness checks and bulk scans don't have to open and parse the files themselves.
+
+    Each entry holds the file `meta` (id, name, url, last_update, update_interval, fields) plus the size,
+    modification time and checksum of the file when it was indexed. An entry is only trusted while the
+    size and modification time still match the file on disk, so files changed by other processes or by
+    hand are simply parsed and indexed again. Several processes can share the index: saving merges the entries
+    changed by this process into the entries saved by the others, under a `FileLock`.
+
+    Attributes:
+    - `path` (`str`): Path of the index file.
+    - `entries` (`dict`): Entries keyed by file path.
+    - `autosave` (`int`): Number of updates after which the index is saved, it is also saved at exit.
+
+    Methods:
+    - `get(file_path: str, validate: bool = True) -> dict`: Returns a copy of the indexed meta of a file, None if it is not indexed or outdated.
+    - `update(file_path: str, meta: dict, checksum: str)`: Indexes a file with its meta, reading its size and modification time from disk.
+    - `updateMeta(file_path: str, meta: dict) -> bool`: Replaces the indexed meta of a file whose content did not change.
+    - `stale(prefix: str = None, now: int = None) -> list`: Returns the indexed files whose update interval has expired.
+    - `revalidate() -> int`: Updates the modification time of the entries of files copied from elsewhere, dropping the ones whose size changed.
+    - `save()`: Saves the index.
+    """
+
+    def __init__(self, path, autosave=100):
+        self.path = path
+        self.autosave = autosave
+        # Guards the entries and the changed set, updated by the threads reading files
+        self.lock = threading.RLock()
+        self.entries = {}
+        self.changed = set()
+        self.dirty = 0
+        self.load()
+        atexit.register(self.save)
+
+    def load(self):
+        with self.lock:
+            self.entries = self.__read_entries()
+            self.changed = set()
+            self.dirty = 0
+
+    def save(self):
+        with self.lock:
+            self.__save()
+
+    def get(self, file_path, validate=True):
+        entry = self.entries.get(file_path)
+        if entry is None:
+            return None
+        if validate:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                return None
+            if stat.st_size != entry["size"] or stat.st_mtime_ns != entry["mtime"]:
+                return None
+        return dict(entry["meta"])
+
+    def getEntry(self, file_path):
+        return self.entries.get(file_path)
+
+    def update(self, file_path, meta, checksum):
+        stat = os.stat(file_path)
+        with self.lock:
+            self.entries[file_path] = {
+                "meta": dict(meta),
+                "size": stat.st_size,
+                "mtime": stat.st_mtime_ns,
+                "checksum": checksum,
+            }
+            self.__touch(file_path)
+
+    def updateMeta(self, file_path, meta):
+        """Replace the indexed meta of a file whose content did not change."""
+        with self.lock:
+            entry = self.entries.get(file_path)
+            if entry is None:
+                return False
+            entry["meta"] = dict(meta)
+            self.__touch(file_path)
+            return True
+
+    def delete(self, file_path):
+        with self.lock:
+            if self.entries.pop(file_path, None) is not None:
+                self.__touch(file_path)
+
+    def stale(self, prefix=None, now=None):
+        """
+        Get the indexed files whose update interval has expired, without touching the files.
+
+        Args:
+            prefix (str, optional): Only consider the files whose path starts with this prefix.
+            now (int, optional): The current timestamp (default is the current time).
+
+        Returns:
+            list: The paths of the stale files.
+        """
+        now = int(time.time()) if now is None else now
+        with self.lock:
+            return [
+                file_path for file_path, entry in self.entries.items()
+                if (prefix is None or file_path.startswith(prefix))
+                and now - entry["meta"]["last_update"] >= entry["meta"]["update_interval"]
+            ]
+
+    def revalidate(self):
+        """
+        Trust again the entries of files that were copied with the index (e.g. extracted from a snapshot), whose
+        modification time changed but not their content. Entries whose file is missing or has another size are dropped.
+
+        Returns:
+            int: The number of valid entries.
+        """
+        with self.lock:
+            for file_path, entry in list(self.entries.items()):
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    stat = None
+                if stat is None or stat.st_size != entry["size"]:
+                    del self.entries[file_path]
+                else:
+                    entry["mtime"] = stat.st_mtime_ns
+                self.changed.add(file_path)
+                self.dirty += 1
+            return len(self.entries)
+
+    def paths(self, prefix=None):
+        with self.lock:
+            return [file_path for file_path in self.entries if prefix is None or file_path.startswith(prefix)]
+
+    def __len__(self):
+        return len(self.entries)
+
+    #######################
+    ### PRIVATE METHODS ###
+    #######################
+
+    def __save(self):
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with FileLock(self.path):
+                # Keep the entries saved by the other processes sharing the index
+                entries = self.__read_entries()
+                for file_path in self.changed:
+                    if file_path in self.entries:
+                        entries[file_path] = self.entries[file_path]
+                    else:
+                        entries.pop(file_path, None)
+                temp_path = f'{self.path}.{os.getpid()}.tmp'
+                with open(temp_path, 'w') as file:
+                    file.write(json.dumps(entries, separators=(',', ':')))
+                os.replace(temp_path, self.path)
+            self.entries = entries
+            self.changed = set()
+            self.dirty = 0
+        except Exception as e:
+            print(f'MetaIndex::save : {str(e)}')
+
+    def __read_entries(self):
+        try:
+            with open(self.path, 'rb') as file:
+                return json.loads(file.read())
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            # A broken index is rebuilt as the files are read
+            print(f'MetaIndex::load : {str(e)}')
+            return {}
+
+    def __touch(self, file_path):
+        self.changed.add(file_path)
+        self.dirty += 1
+        if self.autosave and self.dirty >= self.autosave:
+            self.__save()
@@ -1,6 +1,11 @@
-import requests
+import time
 from concurrent.futures import ThreadPoolExecutor
-from typing import Dict
+from typing import Dict, TYPE_CHECKING
+
+from api.common.utils.Metrics import Metrics
+
+if TYPE_CHECKING:
+    import requests
 
 """
     # RequestManager Class
@@ -14,15 +19,20 @@ from typing import Dict
     ## Attributes
 
     - `session` (`requests.Session`): A shared session object used to manage multiple HTTP requests efficiently.
+      It is created on first use, so `requests` is only imported by the processes that actually make requests.
     - `default_headers` (`dict`): A dictionary of default headers that will be included in each request made using this manager.
     - `bearer_token` (`str`): An optional bearer authentication token to be included in requests for authentication purposes.
     - `session` (`requests.Session`): A shared session object used to manage multiple HTTP requests efficiently.
-    - `max_workers` (`int`): The maximum number of threads to use for concurrent requests.
+    - `max_workers` (`int`): The maximum number of threads to use for concurrent requests. The connection pool of the session is sized to match it.
+    - `retries` (`int`): The number of retries of the requests failing with a connection error or a 429/5xx status.
+    - `backoff_factor` (`float`): The backoff factor between retries (`backoff_factor * 2 ** (retry - 1)` seconds), `Retry-After` headers are respected.
+    - `metrics` (`Metrics`): Counts the requests (`http.requests`, `http.not_modified`, `http.retries`, `http.errors`) and records their latency (`http`), by the `key` given to `get`/`post`.
 
     ## Methods
 
     - `make_request(method: str, url: str, headers: dict = None, params: dict = None, data: dict = None, timeout: int = None, auth: Tuple = None, hooks: dict = None, proxies: dict = None, session: requests.Session = None) -> requests.Response`: Makes an HTTP request using the specified method, URL, and optional custom headers, parameters, and data. Returns the response object if the request is successful, or None in case of a failure.
-    - `get(url: str, headers: dict = None, params: dict = None, timeout: int = None, auth: Tuple = None, hooks: dict = None, proxies: dict = None, session: requests.Session = None) -> requests.Response`: Makes a GET request.
+    - `get(url: str, headers: dict = None, params: dict = None, timeout: int = None, auth: Tuple = None, hooks: dict = None, proxies: dict = None, session: requests.Session = None, key: str = None) -> requests.Response`: Makes a GET request, `key` is the `api_config` key its metrics are recorded under.
+    - `conditionalHeaders(etag: str = None, last_modified: str = None) -> dict`: Returns the `If-None-Match`/`If-Modified-Since` headers of a conditional GET.
     - `post(url: str, headers: dict = None, params: dict = None, data: dict = None, timeout: int = None, auth: Tuple = None, hooks: dict = None, proxies: dict = None, session: requests.Session = None) -> requests.Response`: Makes a POST request.
     
     ## Private Methods
@@ -33,48 +43,94 @@ from typing import Dict
 
 class RequestManager:
 
-    def __init__(self, default_headers: Dict = None, bearer_token: str = None, session: requests.Session = None, max_workers: int = 5):
-        if session is None:
-            self.session = requests.Session()
-        else:
-            self.session = session
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
 
+    def __init__(self, default_headers: Dict = None, bearer_token: str = None, session: "requests.Session" = None, max_workers: int = 5, retries: int = 3, backoff_factor: float = 0.5, metrics: Metrics = None):
+        # Headers of the session, applied when it is created
+        self.headers = {}
         if bearer_token:
-            self.session.headers['Authorization'] = f'Bearer {bearer_token}'
+            self.headers['Authorization'] = f'Bearer {bearer_token}'
 
         if default_headers:
-            self.session.headers.update(default_headers)
-
+            self.headers.update(default_headers)
+
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.metrics = metrics or Metrics()
+        self.__session = None
+        if session is not None:
+            self.__set_session(session)
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    @property
+    def session(self):
+        if self.__session is None:
+            import requests
+            self.__set_session(requests.Session())
+        return self.__session
     
     def __del_(self):
         self.__close_session()
 
-    def get(self, url, headers=None, params=None, timeout=None, auth=None, hooks=None, proxies=None, session=None):
-        return self.executor.submit(self.__make_request, 'GET', url, headers, params, timeout=timeout, auth=auth, hooks=hooks, proxies=proxies, session=session)
+    def get(self, url, headers=None, params=None, timeout=None, auth=None, hooks=None, proxies=None, session=None, key=None):
+        return self.executor.submit(self.__make_request, 'GET', url, headers, params, timeout=timeout, auth=auth, hooks=hooks, proxies=proxies, session=session, key=key)
 
-    def post(self, url, headers=None, params=None, timeout=None, auth=None, hooks=None, proxies=None, session=None):
-        return self.executor.submit(self.__make_request, 'POST', url, headers, params, timeout=timeout, auth=auth, hooks=hooks, proxies=proxies, session=session)
+    def post(self, url, headers=None, params=None, timeout=None, auth=None, hooks=None, proxies=None, session=None, key=None):
+        return self.executor.submit(self.__make_request, 'POST', url, headers, params, timeout=timeout, auth=auth, hooks=hooks, proxies=proxies, session=session, key=key)
 
     def setConfig(self, config):
         if 'headers' in config:
-            self.session.headers.update(config['headers'])
+            self.headers.update(config['headers'])
         if 'params' in config:
             self.params = config['params']
         if 'bearer_token' in config:
-            self.session.headers['Authorization'] = f'Bearer {config["bearer_token"]}'
+            self.headers['Authorization'] = f'Bearer {config["bearer_token"]}'
+        if self.__session is not None:
+            self.__session.headers.update(self.headers)
+        if 'retries' in config:
+            self.retries = config['retries']
+        if 'backoff_factor' in config:
+            self.backoff_factor = config['backoff_factor']
+        if 'max_workers' in config and config['max_workers'] != self.max_workers:
+            self.executor.shutdown(wait=True)
+            self.max_workers = config['max_workers']
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        if self.__session is not None and ('retries' in config or 'backoff_factor' in config or 'max_workers' in config):
+            self.__mount_adapter()
+
+    def conditionalHeaders(self, etag=None, last_modified=None):
+        """
+        Get the headers of a conditional GET, so that the server answers 304 if the resource did not change.
+
+        Args:
+            etag (str, optional): The `ETag` of the last response.
+            last_modified (str, optional): The `Last-Modified` of the last response.
+
+        Returns:
+            dict: The conditional headers.
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
 
     #######################
     ### Private Methods ###
     #######################
 
-    def __make_request(self, method, url, headers=None, params=None, data=None, timeout=None, auth=None, hooks=None, proxies=None, session=None):
+    def __make_request(self, method, url, headers=None, params=None, data=None, timeout=None, auth=None, hooks=None, proxies=None, session=None, key=None):
+        import requests
         session = session or self.session
         headers = headers or {}
         params = params or {}
         request_headers = {**headers}
         request_params = {**params}
 
+        start = time.perf_counter()
+        response = None
         try:
             response = session.request(
                 method,
@@ -88,11 +144,49 @@ class RequestManager:
                 proxies=proxies
             )
             response.raise_for_status()
+            if response.status_code == 304:
+                self.metrics.increment('http.not_modified', key)
             return response
         except requests.exceptions.RequestException as e:
+            self.metrics.increment('http.errors', key)
+            response = response if response is not None else e.response
             print(f"Request failed: {e}")
             return None
-        
+        finally:
+            self.metrics.observe('http', time.perf_counter() - start, key)
+            self.metrics.increment('http.requests', key)
+            retries = self.__count_retries(response)
+            if retries:
+                self.metrics.increment('http.retries', key, retries)
+
+
+    def __set_session(self, session):
+        session.headers.update(self.headers)
+        self.__session = session
+        self.__mount_adapter()
+
+    def __mount_adapter(self):
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=["GET"],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers, max_retries=retry)
+        self.__session.mount('http://', adapter)
+        self.__session.mount('https://', adapter)
+
+    def __count_retries(self, response):
+        # The urllib3 retry state of the response holds one entry per retried attempt
+        retries = getattr(getattr(response, 'raw', None), 'retries', None)
+        return len(getattr(retries, 'history', None) or ())
+
     def __close_session(self):
-        self.session.close()
+        if self.__session is not None:
+            self.__session.close()
         self.executor.shutdown(wait=True)
\ No newline at end of file
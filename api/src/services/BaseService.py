@@ -1,5 +1,6 @@
 from api.common.utils.ApiConfig import api_config
 from ..managers.FileManager import FileManager
+from ..stores.AppConfigSnapshot import AppConfigSnapshot
 
 class BaseService:
     players = {}
@@ -16,23 +17,45 @@ class BaseService:
         file_path = self.__get_file_path(id, key)
         return meta, file_path
     
-    def getAppConfig(self):
+    def getConfigSnapshot(self):
         """
-        Get the application configuration.
+        Get the snapshot of the application configuration shared by all the services of the app.
+        The app config file is only read again once the snapshot has expired, and at most every
+        `AppConfigSnapshot.CHECK_INTERVAL` seconds while the file is not refreshed.
 
         Returns:
-            dict: The application configuration.
+            AppConfigSnapshot: The application configuration snapshot.
         """
+        snapshot = self.app.configSnapshot
+        if snapshot is not None and not snapshot.isExpired():
+            return snapshot
         try:
-            # Get file information and read team players
             meta, file_path = self.getFileInfo("", "app_config")
-            file_config = self.fileManager.read(file_path, meta)
-            if file_config:
-                return file_config
-            else:
+            file_config, file_meta = self.fileManager.read(file_path, meta, with_meta=True)
+            if not file_config:
+                if snapshot is not None:
+                    # Keep the expired snapshot rather than failing every week lookup, and retry later
+                    self.app.configSnapshot = snapshot.renewed()
+                    return self.app.configSnapshot
                 raise Exception("No app config found")
+            if snapshot is None or file_meta["last_update"] != snapshot.last_update:
+                snapshot = AppConfigSnapshot.fromConfig(file_config, file_meta)
+            if snapshot.isExpired():
+                # The file was not refreshed (offline or the refresh failed)
+                snapshot = snapshot.renewed()
+            self.app.configSnapshot = snapshot
+            return snapshot
         except Exception as e:
             raise Exception("Error while fetching app config.") from e
+
+    def getAppConfig(self):
+        """
+        Get the application configuration.
+
+        Returns:
+            tuple: The application configuration.
+        """
+        return self.getConfigSnapshot().config
     
     # API GENERAL
     def getWeekMatches(self, week_id):
@@ -83,8 +106,7 @@ class BaseService:
             list: A list of week IDs.
         """
         try:
-            week_info = self.getAppConfig()[9]
-            return week_info["value"]
+            return list(self.getConfigSnapshot().week_ids)
         except Exception as e:
             raise Exception("Error while fetching week ids.") from e
         
@@ -99,11 +121,7 @@ class BaseService:
             bool: True if the week ID exists, False otherwise.
         """
         try:
-            week_ids = self.getWeekIds()
-            if week_id in week_ids:
-                return True
-            else:
-                return False
+            return self.getConfigSnapshot().hasWeek(week_id)
         except Exception as e:
             raise Exception("Error while checking week id") from e
 
@@ -115,9 +133,7 @@ class BaseService:
             int: The current week ID.
         """
         try:
-            app_config = self.getAppConfig()
-            week_info = app_config[9]
-            return week_info["value"][-1]
+            return self.getConfigSnapshot().current_week_id
         except Exception as e:
             raise Exception("Error while fetching current week id.") from e
 
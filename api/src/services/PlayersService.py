@@ -1,11 +1,23 @@
-import json
+import json, time, threading
 import numpy as np
-import scipy.stats as stats
 
+from api.common.utils.ApiConfig import store_config
+from ..stores.SeasonStore import SeasonStore
+from ..stores.MarketValueStore import MarketValueStore
 from .BaseService import BaseService
 
+# Compact record of a player in the roster
+ROSTER_DTYPE = np.dtype([('id', np.int64), ('position_id', np.int8), ('team_id', np.int32)])
+
 class PlayersService(BaseService):
     players = {}
+    roster: np.ndarray = None
+    marketValues: MarketValueStore = None
+    store: SeasonStore = None
+    # Seconds between two checks of the season store against the player files changed by other processes
+    store_check_interval = 60
+    # Minimum seconds between two patches of the season store, so a burst of refreshes is patched at once
+    store_patch_interval = 1
 
     def __init__(self, app):
         super().__init__(app, app.fileManager)
@@ -23,6 +35,67 @@ class PlayersService(BaseService):
         except Exception as e:
             raise Exception("No players.json file found")
 
+        # Roster, position and team indexes of the players
+        self.__build_indexes()
+
+        # Prefix sums of the players missing from the season store, built from their stats file
+        self.playerIndexes = {}
+
+        # Last check of the season store against the player files, see `__check_store`
+        self.storeCheckedAt = 0
+        self.storeChanges = None
+        self.storePatchedAt = 0
+        self.storeLock = threading.Lock()
+
+        # Open the compiled season store if there is one
+        store_path = store_config["season_store"]["base_path"]
+        if SeasonStore.exists(store_path):
+            try:
+                self.store = SeasonStore.load(store_path)
+            except Exception as e:
+                print(f'PlayersService::_getInitialData : {str(e)}')
+                self.store = None
+
+        # Market value history, opened on first use
+        self.marketValues = None
+
+    # SEASON STORE
+    def compileStore(self, path=None):
+        """
+        Compile the statistics of every player into a `SeasonStore`, save it and use it as the backend
+        for the aggregate stats.
+
+        The store is only used while it matches the player files: once a file is refreshed (by this process at once,
+        by another process within `store_check_interval` seconds) the rows of the refreshed players are compiled
+        again in memory from the stored files, at most every `store_patch_interval` seconds, and the store is saved
+        again by the next `compileStore`. Aggregates read from the store never refresh the files themselves.
+
+        Args:
+            path (str, optional): The directory where the store is saved (default is the `season_store` path).
+
+        Returns:
+            SeasonStore: The compiled store, memory-mapped from disk.
+        """
+        path = path or store_config["season_store"]["base_path"]
+        self.__compile_store().save(path)
+        self.store = SeasonStore.load(path)
+        self.storeCheckedAt = time.monotonic()
+        self.storeChanges = self.fileManager.getChangeCount("player_stats")
+        try:
+            self.recordMarketValues()
+        except Exception as e:
+            print(f'PlayersService::compileStore : {str(e)}')
+        return self.store
+
+    def setStore(self, store):
+        """
+        Set the `SeasonStore` used as the backend for the aggregate stats, None to read the player files.
+        A store without `last_update` is used as it is, it is never checked against the player files.
+        """
+        self.store = store
+        self.storeCheckedAt = 0
+        self.storeChanges = None
+
     # STATIC STATS
     def getInfo(self, player_id):
         """
@@ -63,6 +136,72 @@ class PlayersService(BaseService):
             # print(f'PlayersService::getPlayersIds : {str(e)}')
             return None
 
+    def getRoster(self):
+        """
+        Get the compact records of every player, with the `id`, `position_id` and `team_id` fields.
+
+        Returns:
+            np.ndarray: Structured array of the players (`ROSTER_DTYPE`), read-only.
+        """
+        return self.roster
+
+    def getRecord(self, player_id):
+        """
+        Get the compact record of a player by player ID.
+
+        Args:
+            player_id (str): The unique identifier of the player.
+
+        Returns:
+            np.void: The record of the player (`id`, `position_id`, `team_id`).
+                Returns None if the player is not found.
+        """
+        row = self.getRosterRow(player_id)
+        return None if row is None else self.roster[row]
+
+    def getRosterRow(self, player_id):
+        """
+        Get the row of a player in the roster.
+
+        Returns:
+            int: The row of the player, None if the player is not found.
+        """
+        try:
+            return self.rosterRows.get(int(player_id))
+        except (TypeError, ValueError):
+            return None
+
+    def getPlayersByPosition(self, position_id=None, rows=False):
+        """
+        Get the players of a position.
+
+        Args:
+            position_id (str): The position ID ('1' goalkeepers to '5' coaches). If None, every player is returned.
+            rows (bool): Return the rows of the players in the roster instead of their IDs.
+
+        Returns:
+            np.ndarray: Player IDs (or roster rows) as int64, read-only. Empty if the position is not found.
+        """
+        if position_id is None:
+            indexes = self.allRows
+        else:
+            indexes = self.positionRows.get(int(position_id), self.noRows)
+        return indexes if rows else self.__get_ids(indexes, 'position', position_id)
+
+    def getPlayersByTeam(self, team_id, rows=False):
+        """
+        Get the players of a team.
+
+        Args:
+            team_id (str): The unique identifier of the team.
+            rows (bool): Return the rows of the players in the roster instead of their IDs.
+
+        Returns:
+            np.ndarray: Player IDs (or roster rows) as int64, read-only. Empty if the team is not found.
+        """
+        indexes = self.teamRows.get(int(team_id), self.noRows)
+        return indexes if rows else self.__get_ids(indexes, 'team', team_id)
+
     def didPlayerPlay(self, player_id, weekId):
         """
         Check if a player played in a specific week.
@@ -78,16 +217,53 @@ class PlayersService(BaseService):
             Exception: If an error occurs during the data retrieval.
         """
         try:
-            player_stats = self.getStats(player_id)['playerStats']
-            if player_stats:
-                for stat in player_stats:
-                    if stat.get('weekNumber') == weekId:
-                        return True
-            return False
+            store, row = self.__get_player_index(player_id)
+            if store is None:
+                return False
+            return bool(store.didPlay(row, weekId))
         except Exception as e:
             # print(f'PlayersService::didPlayerPlay : {str(e)}')
             return None
 
+    def getPlayersWhoPlayed(self, week_id):
+        """
+        Get the players who played a specific week.
+
+        Args:
+            week_id (int): The week number.
+
+        Returns:
+            np.ndarray: Player IDs (int64) of the players with stats for the week.
+        """
+        store = self.getStore()
+        return store.player_ids[store.playersWhoPlayed(week_id)]
+
+    def getWeeksPlayed(self, player_id):
+        """
+        Get the weeks played by a player.
+
+        Args:
+            player_id (str): The unique identifier of the player.
+
+        Returns:
+            np.ndarray: Week numbers (int64) with stats for the player, empty if the player is not found.
+        """
+        store, row = self.__get_player_index(player_id)
+        if store is None:
+            return np.zeros(0, dtype=np.int64)
+        return store.weeksPlayed(row)
+
+    def getParticipation(self):
+        """
+        Get the participation of every player in every week, with the minutes played.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: The player IDs (int64), the player x week participation (bool)
+                and the player x week minutes played (int16), indexed by the week number.
+        """
+        store = self.getStore()
+        return store.player_ids, store.played, store.minutes
+
     # BASIC STATS
     def getStats(self, player_id):
         """
@@ -116,6 +292,27 @@ class PlayersService(BaseService):
             # print(f'PlayersService::getStats : {str(e)}')
             return None
 
+    def getStatsMany(self, player_ids):
+        """
+        Get the statistics of several players at once, reading their files in bulk.
+
+        Args:
+            player_ids (list): The unique identifiers of the players.
+
+        Returns:
+            dict: Player statistics keyed by player ID, None for the players that are not found.
+        """
+        files = {}
+        for player_id in player_ids:
+            if str(player_id) in self.players:
+                files[player_id] = self.getFileInfo(player_id, "player_stats")[::-1]
+        try:
+            contents = self.fileManager.readMany(list(files.values()))
+        except Exception as e:
+            print(f'PlayersService::getStatsMany : {str(e)}')
+            contents = {}
+        return {player_id: contents.get(files[player_id][0]) if player_id in files else None for player_id in player_ids}
+
     def getStatsForWeek(self, player_id, week_id):
         """
         Get the statistics of a player for a specific week.
@@ -164,29 +361,127 @@ class PlayersService(BaseService):
             Exception: If an error occurs during the data retrieval.
         """
         try:
-            if not self.checkWeekId(week_id):
+            if week_id is not None and not self.checkWeekId(week_id):
                 raise Exception("Week not found")
             
             if stat_name == 'points': 
                 return self.getTotalPoints(player_id, week_id)
             elif stat_name == 'games_played':
                 return self.getTotalGamesPlayed(player_id, week_id)
-            player_stats = self.getStats(player_id)['playerStats']
-            if player_stats:
-                if week_id is not None:
-                    player_stats = [stat for stat in player_stats if stat.get('weekNumber') <= week_id]
-                total = 0
-                for stat in player_stats:
-                    if stat.get('stats', {}).get(stat_name) == None:
-                        continue
-                    item = stat.get('stats', {}).get(stat_name, [0, 0])[0]
-                    total += item
-                return total
-            return 0
+
+            store, row = self.__get_player_index(player_id)
+            if store is None:
+                return 0
+            column = store.getStatIndex(stat_name)
+            if column is None:
+                return 0
+            return store.cum_stats[row, store.getWeekIndex(week_id), column].item()
         except Exception as e:
             # print(f'PlayersService::getBaseAggregate::{stat_name}: {str(e)}')
             return 0
 
+    def getMetricsVector(self, player_id, week_id, stat_names):
+        """
+        Get the totals of several stats for a specific player until a specified week in a single pass.
+
+        Besides the stat names accepted by `getBaseAggregate`, 'points', 'games_played' and 'market_value'
+        are also accepted.
+
+        Args:
+            player_id (str): The unique identifier of the player.
+            week_id (int): The week number until which stats are to be calculated.
+                If None, it calculates stats for the entire season.
+            stat_names (list): Names of the stats, in the order of the vector.
+
+        Returns:
+            np.ndarray: Totals of the stats (float32), in the order of `stat_names`.
+                Returns None if the week or the player stats are not found.
+        """
+        try:
+            if week_id is not None and not self.checkWeekId(week_id):
+                raise Exception("Week not found")
+
+            store, row = self.__get_player_index(player_id)
+            if store is None:
+                raise Exception("Player stats not found")
+
+            week_index = store.getWeekIndex(week_id)
+            vector = np.zeros(len(stat_names), dtype=np.float32)
+            for i, stat_name in enumerate(stat_names):
+                vector[i] = self.__get_aggregate_column(store, row, week_index, stat_name)
+            return vector
+        except Exception as e:
+            # print(f'PlayersService::getMetricsVector : {str(e)}')
+            return None
+
+    # LEAGUE AGGREGATE STATS
+    def getStore(self):
+        """
+        Get the `SeasonStore` holding every player. If no compiled store is available, one is compiled in
+        memory from the player files, read in bulk (and kept until `setStore` or `compileStore` is called).
+
+        Returns:
+            SeasonStore: The season store.
+        """
+        self.__check_store()
+        if self.store is None:
+            self.store = self.__compile_store()
+            self.storeCheckedAt = time.monotonic()
+            self.storeChanges = self.fileManager.getChangeCount("player_stats")
+        return self.store
+
+    def getPlayerIndex(self):
+        """
+        Get the player ids in the order of the rows returned by the league aggregates.
+
+        Returns:
+            np.ndarray: Player ids (int64).
+        """
+        return self.getStore().player_ids
+
+    def aggregateAll(self, stat_name, week_id=None):
+        """
+        Calculate the total of a stat for every player until a specified week or throughout the season.
+
+        Args:
+            stat_name (str): Name of the stat, as accepted by `getMetricsVector`.
+            week_id (int): The week number until which the stat is to be calculated.
+                If None, it calculates the stat for the entire season.
+
+        Returns:
+            np.ndarray: Totals of the stat (float32), aligned to `getPlayerIndex`.
+                Returns None if the week is not found.
+        """
+        matrix = self.aggregateMatrix([stat_name], week_id)
+        return None if matrix is None else matrix[:, 0]
+
+    def aggregateMatrix(self, stat_names, week_id=None):
+        """
+        Calculate the totals of several stats for every player until a specified week or throughout the season.
+
+        Args:
+            stat_names (list): Names of the stats, as accepted by `getMetricsVector`.
+            week_id (int): The week number until which the stats are to be calculated.
+                If None, it calculates the stats for the entire season.
+
+        Returns:
+            np.ndarray: Player x stat totals (float32), rows aligned to `getPlayerIndex` and columns to `stat_names`.
+                Returns None if the week is not found.
+        """
+        try:
+            if week_id is not None and not self.checkWeekId(week_id):
+                raise Exception("Week not found")
+
+            store = self.getStore()
+            week_index = store.getWeekIndex(week_id)
+            matrix = np.zeros((len(store.player_ids), len(stat_names)), dtype=np.float32)
+            for i, stat_name in enumerate(stat_names):
+                matrix[:, i] = self.__get_aggregate_column(store, slice(None), week_index, stat_name)
+            return matrix
+        except Exception as e:
+            print(f'PlayersService::aggregateMatrix : {str(e)}')
+            return None
+
     def getTotalMinutesPlayed(self, player_id, week_id=None):
         return self.getBaseAggregate(player_id, week_id, 'mins_played')
 
@@ -266,13 +561,10 @@ class PlayersService(BaseService):
             Exception: If an error occurs during the data retrieval.
         """
         try:
-            player_stats = self.getStats(player_id)['playerStats']
-            if player_stats:
-                if week_id is not None:
-                    player_stats = [stat for stat in player_stats if stat.get('weekNumber') <= week_id]
-                total_points = sum(stat.get('totalPoints', 0) for stat in player_stats)
-                return total_points
-            return None
+            store, row = self.__get_player_index(player_id)
+            if store is None:
+                return None
+            return store.cum_points[row, store.getWeekIndex(week_id)].item()
         except Exception as e:
             # print(f'PlayersService::getTotalPoints : {str(e)}')
             return None
@@ -294,17 +586,10 @@ class PlayersService(BaseService):
             Exception: If an error occurs during the data retrieval.
         """
         try:
-            player_stats = self.getStats(player_id)['playerStats']
-            if player_stats:
-                if week_id is not None:
-                    player_stats = [stat for stat in player_stats if stat.get('weekNumber') <= week_id]
-                try:
-                    player_stats = [stat for stat in player_stats if stat.get('stats', {}).get('mins_played', 0)[0] > 0]
-                except:
-                    return 0
-                total_games_played = len(player_stats)
-                return total_games_played
-            return 0
+            store, row = self.__get_player_index(player_id)
+            if store is None:
+                return 0
+            return int(store.cum_games[row, store.getWeekIndex(week_id)])
         except Exception as e:
             # print(f'PlayersService::getTotalGamesPlayed : {str(e)}')
             return 0
@@ -338,6 +623,11 @@ class PlayersService(BaseService):
     # ADVANCED STATS
     def getMarketValue(self, player_id):
         try:
+            self.__check_store()
+            row = self.store.getPlayerIndex(player_id) if self.store else None
+            if row is not None:
+                return float(self.store.market_value[row])
+
             player = self.getStats(player_id)
             if player:
                 return player.get('marketValue')
@@ -347,7 +637,7 @@ class PlayersService(BaseService):
 
     def getMarketValueTrends(self, player_id):
         """
-        Analyze how a player's market value changes over the season.
+        Analyze how a player's market value changes over the season, from the recorded market value history.
 
         Args:
             player_id (str): The unique identifier of the player.
@@ -360,42 +650,168 @@ class PlayersService(BaseService):
             Exception: If an error occurs during the data retrieval.
         """
         try:
-            player_stats = self.getStats(player_id)
-            if player_stats:
-                # Extract weeks and corresponding market values
-                weeks = [stat.get('weekNumber') for stat in player_stats]
-                market_values = [stat.get('marketValue') for stat in player_stats]
-
-                # Check if there is sufficient data for analysis
-                if len(weeks) > 1 and len(market_values) > 1:
-                    # Calculate trend line using linear regression
-                    coefficients = np.polyfit(weeks, market_values, 1)
-                    polynomial = np.poly1d(coefficients)
-                    trend_values = polynomial(weeks)
-
-                    # Return a dictionary containing market value trends
-                    return {
-                        "weeks": weeks,
-                        "market_values": market_values,
-                        "trend_values": trend_values.tolist()
-                    }
+            history = self.getMarketValueHistory()
+            weeks, market_values = history.series(player_id)
+
+            # Check if there is sufficient data for analysis
+            if len(weeks) > 1:
+                row = history.getPlayerIndex(player_id)
+                slope, intercept, _ = history.trends()
+                trend_values = intercept[row] + slope[row] * weeks
+
+                # Return a dictionary containing market value trends
+                return {
+                    "weeks": weeks.tolist(),
+                    "market_values": market_values.tolist(),
+                    "trend_values": trend_values.tolist(),
+                    "slope": float(slope[row]),
+                    "intercept": float(intercept[row]),
+                }
             return None
         except Exception as e:
             print(f'PlayersService::getMarketValueTrends : {str(e)}')
             return None
 
-    def getTTestMinutesPlayed(self, player_id):
+    def getMarketValueTrendsAll(self, week_id=None):
+        """
+        Fit the linear trend of the market value of every player at once.
+
+        Args:
+            week_id (int, optional): Only use the values recorded until this week, None for the whole history.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: The player ids (int64), and the slope (value per week) and
+                intercept (float64) of their trend, NaN for the players with less than two recorded values.
+        """
+        history = self.getMarketValueHistory()
+        slope, intercept, _ = history.trends(week_id)
+        return history.player_ids, slope, intercept
+
+    def getMarketValueHistory(self):
+        """
+        Get the `MarketValueStore` holding the weekly market values of every player, empty if none was recorded yet.
+
+        Returns:
+            MarketValueStore: The market value history.
+        """
+        if self.marketValues is None:
+            path = store_config["market_values"]["base_path"]
+            try:
+                self.marketValues = MarketValueStore.load(path) if MarketValueStore.exists(path) else MarketValueStore()
+            except Exception as e:
+                print(f'PlayersService::getMarketValueHistory : {str(e)}')
+                self.marketValues = MarketValueStore()
+        return self.marketValues
+
+    def recordMarketValues(self, week_id=None, path=None):
+        """
+        Record the current market value of every player (from the season store) as the value of a week, and save
+        the history. Recording the same week again replaces its values, the other weeks are kept.
+
+        Args:
+            week_id (int, optional): The week of the values (default is the current week).
+            path (str, optional): The directory where the history is saved (default is the `market_values` path).
+
+        Returns:
+            MarketValueStore: The market value history.
+        """
+        week_id = self.getCurrentWeekId() if week_id is None else week_id
+        store = self.getStore()
+        history = self.getMarketValueHistory()
+        history.record(week_id, store.player_ids, np.where(store.market_value > 0, store.market_value, np.nan))
+        history.save(path or store_config["market_values"]["base_path"])
+        return history
+
+    def getTTestMinutesPlayed(self, player_id, week_id=None):
+        """
+        Test whether the minutes played by a player in the weeks they played differ from the league average.
+
+        Args:
+            player_id (str): The unique identifier of the player.
+            week_id (int, optional): Only use the weeks until this week, None for the whole season.
+
+        Returns:
+            dict: The `statistic`, `pvalue`, degrees of freedom (`df`), `mean` and 95% `confidence_interval` of the test.
+                Returns None if the player is not found or played less than two weeks.
+        """
         try:
-            player_stats = self.getStats(player_id)['playerStats']
-            if player_stats:
-                minutes_played = [sum(stat.get('stats', {}).get('mins_played', [0, 0])) for stat in player_stats]
-                t_test_minutes_played = stats.ttest_1samp(minutes_played, popmean=np.mean(minutes_played))
-                return t_test_minutes_played
-            return None
+            row = self.getStore().getPlayerIndex(player_id)
+            if row is None:
+                return None
+            test = self.testStats(['mins_played'], week_id)['mins_played']
+            if test["n"][row] < 2:
+                return None
+            return {
+                "statistic": float(test["statistic"][row]),
+                "pvalue": float(test["pvalue"][row]),
+                "df": int(test["n"][row]) - 1,
+                "mean": float(test["mean"][row]),
+                "confidence_interval": (float(test["ci_low"][row]), float(test["ci_high"][row])),
+            }
         except Exception as e:
-            print(f'PlayersService::analyzePlayerStatistics : {str(e)}')
+            print(f'PlayersService::getTTestMinutesPlayed : {str(e)}')
             return None
-    
+
+    def testStats(self, stat_names, week_id=None, popmean=None, confidence=0.95):
+        """
+        Run a one-sample t-test and compute a confidence interval of the weekly mean of several stats, for every
+        player at once. The samples of a player are the weeks they played, and each player is tested against the
+        league mean of the stat (the mean over every week played by every player) unless `popmean` is given.
+
+        Args:
+            stat_names (list): Names of the stats, as accepted by `SeasonStore.getWeekValues` ('points', 'mins_played', ...).
+            week_id (int, optional): Only use the weeks until this week (included), None for the whole season.
+            popmean (float | dict, optional): The mean tested against, for every stat or keyed by stat name.
+            confidence (float, optional): The confidence level of the intervals (default is 0.95).
+
+        Returns:
+            dict: For every stat, a dictionary of arrays aligned to `getPlayerIndex`: the number of weeks `n`, the
+                `mean` and `std` (ddof=1), the `popmean`, the t `statistic`, the two-sided `pvalue`, and the
+                `ci_low`/`ci_high` bounds of the confidence interval. Values are NaN for players with less than two weeks.
+                Stats that are not in the store are left out.
+        """
+        # Imported on first use, scipy.stats takes longer to import than the rest of the api package
+        from scipy.stats import t as student_t
+
+        store = self.getStore()
+        week_index = store.getWeekIndex(week_id)
+        # Weeks played until the week, week 0 is never played
+        played = np.asarray(store.played[:, :week_index + 1], dtype=bool)
+        n = played.sum(axis=1)
+        df = np.where(n > 1, n - 1, np.nan)
+        critical = student_t.ppf(0.5 + confidence / 2, df)
+
+        results = {}
+        for stat_name in stat_names:
+            values = store.getWeekValues(stat_name)
+            if values is None:
+                continue
+            samples = np.where(played, np.asarray(values[:, :week_index + 1], dtype=np.float64), 0.0)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean = samples.sum(axis=1) / n
+                variance = (np.where(played, samples - mean[:, None], 0.0) ** 2).sum(axis=1) / df
+                std = np.sqrt(variance)
+                sem = std / np.sqrt(n)
+
+                mu = popmean.get(stat_name) if isinstance(popmean, dict) else popmean
+                if mu is None:
+                    mu = samples.sum() / n.sum() if n.sum() else np.nan
+                statistic = (mean - mu) / sem
+            pvalue = 2 * student_t.sf(np.abs(statistic), df)
+
+            results[stat_name] = {
+                "n": n,
+                "mean": mean,
+                "std": std,
+                "popmean": float(mu),
+                "statistic": statistic,
+                "pvalue": pvalue,
+                "ci_low": mean - critical * sem,
+                "ci_high": mean + critical * sem,
+            }
+        return results
+
     # OTHER 
     def getAbsences(self):
         """
@@ -416,3 +832,136 @@ class PlayersService(BaseService):
         except Exception as e:
             print(f'PlayersService::getAbsences : {str(e)}')
             return None
+
+    #######################
+    ### PRIVATE METHODS ###
+    #######################
+
+    def __build_indexes(self):
+        """
+        Build the roster of the players and the position and team indexes, as arrays of roster rows.
+        """
+        records = []
+        for player_id, info in self.players.items():
+            try:
+                records.append((int(player_id), int(info.get('positionId') or 0), int(info.get('team_id') or 0)))
+            except (TypeError, ValueError) as e:
+                print(f'PlayersService::__build_indexes : {str(e)}')
+
+        self.roster = np.array(records, dtype=ROSTER_DTYPE)
+        self.roster.flags.writeable = False
+        self.rosterRows = {player_id: row for row, player_id in enumerate(self.roster['id'].tolist())}
+        self.allRows = self.__read_only(np.arange(len(self.roster), dtype=np.int64))
+        self.noRows = self.__read_only(np.zeros(0, dtype=np.int64))
+        self.positionRows = self.__group_rows(self.roster['position_id'])
+        self.teamRows = self.__group_rows(self.roster['team_id'])
+        # Player IDs of the groups, built on first use
+        self.groupIds = {}
+
+    def __group_rows(self, keys):
+        order = np.argsort(keys, kind='stable').astype(np.int64)
+        values, starts = np.unique(keys[order], return_index=True)
+        return {int(value): self.__read_only(rows) for value, rows in zip(values, np.split(order, starts[1:]))}
+
+    def __get_ids(self, rows, group, key):
+        key = (group, None if key is None else int(key))
+        ids = self.groupIds.get(key)
+        if ids is None:
+            ids = self.groupIds[key] = self.__read_only(self.roster['id'][rows])
+        return ids
+
+    def __read_only(self, array):
+        array.flags.writeable = False
+        return array
+
+    def __get_aggregate_column(self, store, rows, week_index, stat_name):
+        if stat_name == 'points':
+            return store.cum_points[rows, week_index]
+        elif stat_name == 'games_played':
+            return store.cum_games[rows, week_index]
+        elif stat_name == 'market_value':
+            return store.market_value[rows]
+        column = store.getStatIndex(stat_name)
+        if column is None:
+            return 0
+        return store.cum_stats[rows, week_index, column]
+
+    def __get_player_index(self, player_id):
+        """
+        Get the store and row holding the prefix sums of a player. Players missing from the season store are
+        indexed from their stats file, and indexed again only when the file has been read again.
+
+        Returns:
+            Tuple[SeasonStore, int]: The store and the row of the player, (None, None) if there are no stats.
+        """
+        self.__check_store()
+        if self.store is not None:
+            row = self.store.getPlayerIndex(player_id)
+            if row is not None:
+                return self.store, row
+
+        stats = self.getStats(player_id)
+        if not stats:
+            return None, None
+        indexed = self.playerIndexes.get(str(player_id))
+        if indexed is None or indexed[0] is not stats:
+            indexed = (stats, SeasonStore.compile({player_id: stats}))
+            self.playerIndexes[str(player_id)] = indexed
+        return indexed[1], 0
+
+    def __check_store(self):
+        """
+        Patch the season store (in memory) with the player files refreshed after the store was compiled, read from
+        the backend as they are stored (never requested). The files are only checked after a change made through the
+        file manager of this process, or every `store_check_interval` seconds for the changes made by other processes,
+        and the store is patched at most every `store_patch_interval` seconds. A single thread checks at a time, the
+        others keep reading the current store.
+        """
+        store = self.store
+        if store is None or store.last_update is None:
+            return
+        changes = self.fileManager.getChangeCount("player_stats")
+        now = time.monotonic()
+        if changes == self.storeChanges and now - self.storeCheckedAt < self.store_check_interval:
+            return
+        if now - self.storePatchedAt < self.store_patch_interval or not self.storeLock.acquire(blocking=False):
+            return
+        try:
+            self.storeChanges = changes
+            self.storeCheckedAt = now
+            changed = []
+            for player_id in self.getPlayersIds():
+                meta = self.fileManager.getMeta(self.getFileInfo(player_id, "player_stats")[1])
+                row = store.getPlayerIndex(player_id)
+                if meta is not None and meta["last_update"] > (store.last_update[row] if row is not None else 0):
+                    changed.append(player_id)
+            if not changed:
+                return
+            self.storePatchedAt = now
+            players, last_updates = self.__read_stats(changed, refresh=False)
+            patched = store.patch(players, last_updates)
+            self.store = patched if patched is not None else self.__compile_store(refresh=False)
+        except Exception as e:
+            print(f'PlayersService::__check_store : {str(e)}')
+        finally:
+            self.storeLock.release()
+
+    def __compile_store(self, refresh=True):
+        """
+        Compile a `SeasonStore` in memory from the player files, read in bulk with their meta (and refreshed unless `refresh` is False).
+        """
+        return SeasonStore.compile(*self.__read_stats(self.getPlayersIds(), refresh))
+
+    def __read_stats(self, player_ids, refresh=True):
+        """
+        Read the stats files of some players in bulk, return their payloads and the `last_update` of their files, keyed by player id.
+        """
+        files = {player_id: self.getFileInfo(player_id, "player_stats")[::-1] for player_id in player_ids}
+        contents = self.fileManager.readMany(list(files.values()), with_meta=True, refresh=refresh)
+        players = {}
+        last_updates = {}
+        for player_id, (file_path, _) in files.items():
+            data, meta = contents.get(file_path) or (None, None)
+            players[player_id] = data
+            last_updates[player_id] = meta["last_update"] if meta else 0
+        return players, last_updates
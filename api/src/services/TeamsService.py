@@ -1,8 +1,12 @@
 import json
+import numpy as np
+
 from .BaseService import BaseService
 
 class TeamsService(BaseService):
     teams = {}
+    # Team x player membership, built from the players roster for the rows of the season store
+    membership: np.ndarray = None
 
     def __init__(self, app):
         super().__init__(app, app.fileManager)
@@ -20,6 +24,11 @@ class TeamsService(BaseService):
         except Exception as e:
             raise Exception("No teams.json file found")
 
+        self.teamIds = np.array(sorted(int(team_id) for team_id in self.teams), dtype=np.int64)
+        self.teamRows = {team_id: row for row, team_id in enumerate(self.teamIds.tolist())}
+        self.membership = None
+        self.membershipStore = None
+
     # STATIC STATS
     def getInfo(self, team_id):
         """
@@ -84,6 +93,23 @@ class TeamsService(BaseService):
         except Exception as e:
             raise Exception("Error while fetching team players.") from e
 
+    def getRoster(self, team_id):
+        """
+        Get the IDs of the players of a team from the players index, without reading the team players file.
+
+        Args:
+            team_id (str): The unique identifier of the team.
+
+        Returns:
+            np.ndarray: Player IDs (int64) of the team.
+
+        Raises:
+            Exception: If the team is not found.
+        """
+        if not self.teams.get(str(team_id)):
+            raise Exception("Team not found")
+        return self.app.players.getPlayersByTeam(team_id)
+
     def getMatches(self, team_id):
         """
         Get the matches played by a specific team.
@@ -149,8 +175,7 @@ class TeamsService(BaseService):
             Exception: If an error occurs during the data retrieval.
         """
         try:
-            week_ids = self.getWeekIds()
-            if not week_id in week_ids:
+            if not self.checkWeekId(week_id):
                 raise Exception("Week not found")
             
             meta, file_path = self.getFileInfo(week_id, "ideal_team")
@@ -176,8 +201,7 @@ class TeamsService(BaseService):
             Exception: If an error occurs during the data retrieval.
         """
         try:
-            week_ids = self.getWeekIds()
-            if not week_id in week_ids:
+            if not self.checkWeekId(week_id):
                 raise Exception("Week not found")
 
             meta, file_path = self.getFileInfo(week_id, "profitable_team")
@@ -189,6 +213,66 @@ class TeamsService(BaseService):
         except Exception as e:
             raise Exception("Error while fetching profitable team.") from e
     
+    # LEAGUE AGGREGATE STATS
+    def getTeamIndex(self):
+        """
+        Get the team ids in the order of the rows returned by the league aggregates.
+
+        Returns:
+            np.ndarray: Team ids (int64).
+        """
+        return self.teamIds
+
+    def getMembership(self):
+        """
+        Get the team x player membership matrix, with a 1 where the player belongs to the team. Rows are aligned
+        to `getTeamIndex` and columns to `PlayersService.getPlayerIndex`, so team totals are a matrix product
+        with the player totals.
+
+        Returns:
+            np.ndarray: Team x player membership (float32).
+        """
+        store = self.app.players.getStore()
+        if self.membership is None or self.membershipStore is not store:
+            self.membership = self.__build_membership(store.player_ids)
+            self.membershipStore = store
+        return self.membership
+
+    def aggregateAll(self, stat_name, week_id=None):
+        """
+        Calculate the total of a stat for every team until a specified week or throughout the season.
+
+        Args:
+            stat_name (str): Name of the stat, as accepted by `PlayersService.aggregateAll`.
+            week_id (int): The week number until which the stat is to be calculated.
+                If None, it calculates the stat for the entire season.
+
+        Returns:
+            np.ndarray: Totals of the stat (float32), aligned to `getTeamIndex`.
+                Returns None if the week is not found.
+        """
+        matrix = self.aggregateMatrix([stat_name], week_id)
+        return None if matrix is None else matrix[:, 0]
+
+    def aggregateMatrix(self, stat_names, week_id=None):
+        """
+        Calculate the totals of several stats for every team until a specified week or throughout the season,
+        as the product of the membership matrix with the player totals.
+
+        Args:
+            stat_names (list): Names of the stats, as accepted by `PlayersService.aggregateMatrix`.
+            week_id (int): The week number until which the stats are to be calculated.
+                If None, it calculates the stats for the entire season.
+
+        Returns:
+            np.ndarray: Team x stat totals (float32), rows aligned to `getTeamIndex` and columns to `stat_names`.
+                Returns None if the week is not found.
+        """
+        players = self.app.players.aggregateMatrix(stat_names, week_id)
+        if players is None:
+            return None
+        return self.getMembership() @ players
+
     # AGGREGATE STATS 
     def getBaseAggregate(self, team_id, week_id, stat_name):
         """
@@ -208,24 +292,13 @@ class TeamsService(BaseService):
             Exception: If an error occurs during the data retrieval.
         """
         try:
-            if not self.checkWeekId(week_id):
+            row = self.__get_team_row(team_id)
+            totals = self.app.players.aggregateAll(stat_name, week_id)
+            if totals is None:
                 raise Exception("Week not found")
-            
-            players = self.getPlayers(team_id)
-
-            if not players:
-                raise Exception("Team not found")
-
-            total = 0
-            for player in players:
-                player_id = player.get('id')
-                if not player_id:
-                     raise Exception("Error getting player id")
-                player_total = self.app.players.getBaseAggregate(player_id, week_id, stat_name)
-                total += player_total
-            return total
+            return (self.getMembership()[row] @ totals).item()
         except Exception as e:
-            print(f'PlayersService::getBaseAggregate::{stat_name}: {str(e)}')
+            print(f'TeamsService::getBaseAggregate::{stat_name}: {str(e)}')
             return 0
 
     def getTotalGoals(self, team_id, week_id=None):
@@ -302,17 +375,10 @@ class TeamsService(BaseService):
             Exception: If an error occurs during the data retrieval.
         """
         try:
-            players = self.getPlayers(teamId)
-            if players:
-               raise Exception("Team not found")
-            
-            total = 0
-            for player in players:
-                player_id = player.get('id')
-                if not player_id:
-                    raise Exception("Error getting player id")
-                total += self.app.players.getMarketValue(player_id)
-            return total
+            row = self.__get_team_row(teamId)
+            # float64 market values, float32 totals would round them
+            market_value = self.app.players.getStore().market_value
+            return (self.getMembership()[row] @ market_value).item()
         except Exception as e:
             print(f'TeamsService::getTotalMarketValue: {str(e)}')
             return 0
@@ -408,21 +474,23 @@ class TeamsService(BaseService):
         Raises:
             Exception: If an error occurs during the data retrieval.
         """
-        try:
-            found = self.teams.get(str(team_id))
-            if not found:
-                raise Exception("Team not found")
-
-            team_players = self.getPlayers(team_id)
-            total_points = 0
-            if team_players:
-                for player in team_players:
-                    if "playerStats" in player:
-                        player_stats = player["playerStats"]
-                        if week_id is not None:
-                            player_stats = [stat for stat in player_stats if stat.get('weekNumber') <= week_id]
-                        total_points += sum(stat.get("totalPoints", 0) for stat in player_stats)
-            return total_points
-        except Exception as e:
-            print(f'TeamsService::getTotalPoints: {str(e)}')
-            return 0
+        return self.getBaseAggregate(team_id, week_id, 'points')
+
+    #######################
+    ### PRIVATE METHODS ###
+    #######################
+
+    def __get_team_row(self, team_id):
+        row = self.teamRows.get(int(team_id))
+        if row is None:
+            raise Exception("Team not found")
+        return row
+
+    def __build_membership(self, player_ids):
+        membership = np.zeros((len(self.teamIds), len(player_ids)), dtype=np.float32)
+        for column, player_id in enumerate(player_ids.tolist()):
+            record = self.app.players.getRecord(player_id)
+            row = None if record is None else self.teamRows.get(int(record['team_id']))
+            if row is not None:
+                membership[row, column] = 1
+        return membership
@@ -0,0 +1,70 @@
+import time
+from dataclasses import dataclass, replace
+
+@dataclass(frozen=True)
+class AppConfigSnapshot:
+    """
+    Immutable snapshot of the application configuration and the week ids it holds.
+
+    A snapshot is valid until the `update_interval` of the app config file expires. After that the file is read
+    again, and the snapshot is only replaced when the `last_update` of the file changed. Otherwise (offline, or
+    the refresh failed) the snapshot is renewed and the file is checked again after `CHECK_INTERVAL` seconds, so
+    the week lookups don't go through the `FileManager` on every call.
+
+    Attributes:
+    - `config` (`tuple`): The application configuration entries.
+    - `week_ids` (`tuple`): The week ids, in the order of the configuration.
+    - `week_id_set` (`frozenset`): The week ids, for O(1) lookups.
+    - `current_week_id` (`int`): The last week id.
+    - `last_update` (`int`): The `last_update` of the app config file the snapshot was taken from.
+    - `update_interval` (`int`): The `update_interval` of the app config file.
+    - `expires_at` (`int`): The timestamp after which the app config file is read again.
+    """
+
+    # Position of the week ids in the app config
+    WEEKS_INDEX = 9
+    # Seconds before an expired app config file that did not change is checked again
+    CHECK_INTERVAL = 60
+
+    config: tuple
+    week_ids: tuple
+    week_id_set: frozenset
+    current_week_id: int
+    last_update: int
+    update_interval: int
+    expires_at: int
+
+    @classmethod
+    def fromConfig(cls, config, meta):
+        """
+        Take a snapshot of the app config.
+
+        Args:
+            config (list): The application configuration, as read from the app config file.
+            meta (dict): Metadata of the app config file.
+
+        Returns:
+            AppConfigSnapshot: The snapshot.
+        """
+        week_ids = tuple(config[cls.WEEKS_INDEX]["value"])
+        return cls(
+            config=tuple(config),
+            week_ids=week_ids,
+            week_id_set=frozenset(week_ids),
+            current_week_id=week_ids[-1] if week_ids else None,
+            last_update=meta["last_update"],
+            update_interval=meta["update_interval"],
+            expires_at=meta["last_update"] + meta["update_interval"],
+        )
+
+    def renewed(self, now=None):
+        """Return a copy of the snapshot that expires again after `CHECK_INTERVAL` seconds (at most the `update_interval`)."""
+        now = int(time.time()) if now is None else now
+        return replace(self, expires_at=now + min(self.update_interval, self.CHECK_INTERVAL))
+
+    def hasWeek(self, week_id):
+        return week_id in self.week_id_set
+
+    def isExpired(self, now=None):
+        now = int(time.time()) if now is None else now
+        return now >= self.expires_at
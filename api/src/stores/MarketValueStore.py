@@ -0,0 +1,161 @@
+import os
+import numpy as np
+
+class MarketValueStore:
+    """
+    The `MarketValueStore` class keeps the history of the market value of every player, one value per week,
+    in a dense player x week array. The API only returns the current market value of a player, so the history
+    is built by recording the values of every week as the season goes on.
+
+    The week axis is indexed by the week number itself (index 0 is never recorded), and weeks without a
+    recorded value are NaN. Recording a week replaces the values of that week only: the values of the other
+    weeks are never modified, so the history is append-only.
+
+    Attributes:
+    - `player_ids` (`np.ndarray`): Player ids (int64), aligned to the first axis of `values`.
+    - `values` (`np.ndarray`): Player x week market values (float64), NaN where no value was recorded.
+
+    Methods:
+    - `record(week_id: int, player_ids: np.ndarray, values: np.ndarray)`: Records the market values of some players for a week.
+    - `trends(week_id: int = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]`: Fits the linear trend of every player at once.
+    - `series(player_id) -> Tuple[np.ndarray, np.ndarray]`: Returns the recorded weeks and values of a player.
+    - `save(path: str)`: Saves the store as a `values.npy` file plus an `index.npz` file in the given directory.
+    - `load(path: str) -> MarketValueStore`: Opens a saved store.
+    - `exists(path: str) -> bool`: Checks if a saved store exists in the given directory.
+    - `getPlayerIndex(player_id) -> int`: Returns the row of a player, None if the player is not in the store.
+    """
+
+    VERSION = 1
+
+    def __init__(self, player_ids=None, values=None):
+        self.player_ids = np.asarray([] if player_ids is None else player_ids, dtype=np.int64)
+        if values is None:
+            values = np.full((len(self.player_ids), 1), np.nan, dtype=np.float64)
+        self.values = values
+        self.player_index = {int(player_id): i for i, player_id in enumerate(self.player_ids)}
+
+    @property
+    def n_weeks(self):
+        return self.values.shape[1]
+
+    def record(self, week_id, player_ids, values):
+        """
+        Record the market values of some players for a week, replacing the values already recorded for that week.
+        Players and weeks not in the store yet are added.
+
+        Args:
+            week_id (int): The week number.
+            player_ids (np.ndarray): Player ids.
+            values (np.ndarray): Market values, aligned to `player_ids`. NaN values are not recorded.
+        """
+        week_id = int(week_id)
+        if week_id < 1:
+            raise Exception(f"Invalid week: {week_id}")
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+
+        new_ids = [player_id for player_id in dict.fromkeys(player_ids.tolist()) if player_id not in self.player_index]
+        n_players = len(self.player_ids) + len(new_ids)
+        n_weeks = max(self.n_weeks, week_id + 1)
+        if n_players != self.values.shape[0] or n_weeks != self.n_weeks:
+            grown = np.full((n_players, n_weeks), np.nan, dtype=np.float64)
+            grown[:self.values.shape[0], :self.n_weeks] = self.values
+            self.values = grown
+            for player_id in new_ids:
+                self.player_index[player_id] = len(self.player_index)
+            self.player_ids = np.concatenate([self.player_ids, np.asarray(new_ids, dtype=np.int64)])
+
+        rows = np.fromiter((self.player_index[player_id] for player_id in player_ids.tolist()), dtype=np.int64, count=len(player_ids))
+        recorded = ~np.isnan(values)
+        self.values[rows[recorded], week_id] = values[recorded]
+
+    def trends(self, week_id=None):
+        """
+        Fit the least-squares line of the market value over the weeks of every player at once, with the closed-form
+        solution over the recorded weeks (the weeks without a value are left out of the fit of each player).
+
+        Args:
+            week_id (int, optional): Only use the values recorded until this week (included), None for every week.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: The slope (value per week) and intercept (float64) of every
+                player, aligned to `player_ids` and NaN for the players with less than two values, and the number of
+                values of every player (int64).
+        """
+        values = self.values if week_id is None else self.values[:, :max(0, int(week_id)) + 1]
+        recorded = ~np.isnan(values)
+        weeks = np.arange(values.shape[1], dtype=np.float64)
+        y = np.where(recorded, values, 0.0)
+
+        n = recorded.sum(axis=1)
+        sum_x = recorded @ weeks
+        sum_xx = recorded @ (weeks * weeks)
+        sum_y = y.sum(axis=1)
+        sum_xy = y @ weeks
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            denominator = n * sum_xx - sum_x * sum_x
+            slope = (n * sum_xy - sum_x * sum_y) / denominator
+            intercept = (sum_y - slope * sum_x) / n
+        fitted = n >= 2
+        slope[~fitted] = np.nan
+        intercept[~fitted] = np.nan
+        return slope, intercept, n
+
+    def series(self, player_id):
+        """Return the recorded weeks (int64) and market values (float64) of a player, empty if the player is not in the store."""
+        row = self.getPlayerIndex(player_id)
+        if row is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        weeks = np.flatnonzero(~np.isnan(self.values[row]))
+        return weeks, self.values[row, weeks]
+
+    def save(self, path):
+        """
+        Save the store in a directory, as a `values.npy` file plus an `index.npz` file.
+
+        Args:
+            path (str): The directory where the store is saved.
+        """
+        os.makedirs(path, exist_ok=True)
+        # Written next to the target and moved over it, so readers never see a partial file
+        temp_path = os.path.join(path, f"values.{os.getpid()}.tmp.npy")
+        np.save(temp_path, np.ascontiguousarray(self.values))
+        os.replace(temp_path, os.path.join(path, "values.npy"))
+        temp_path = os.path.join(path, f"index.{os.getpid()}.tmp.npz")
+        np.savez(temp_path, version=np.int64(self.VERSION), player_ids=self.player_ids)
+        os.replace(temp_path, os.path.join(path, "index.npz"))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Open a saved store. The values are loaded in memory, since recording modifies them.
+
+        Args:
+            path (str): The directory where the store was saved.
+
+        Returns:
+            MarketValueStore: The loaded store.
+        """
+        with np.load(os.path.join(path, "index.npz")) as index:
+            if int(index["version"]) != cls.VERSION:
+                raise Exception(f"Unsupported market value store version {int(index['version'])}")
+            player_ids = index["player_ids"]
+        values = np.load(os.path.join(path, "values.npy"))
+        if values.shape[0] != len(player_ids):
+            raise Exception("The market value store index does not match its values")
+        return cls(player_ids, values)
+
+    @classmethod
+    def exists(cls, path):
+        return os.path.exists(os.path.join(path, "index.npz"))
+
+    def getPlayerIndex(self, player_id):
+        try:
+            return self.player_index.get(int(player_id))
+        except (TypeError, ValueError):
+            return None
+
+    def __repr__(self):
+        recorded = int((~np.isnan(self.values)).any(axis=0).sum())
+        return f"MarketValueStore(players={len(self.player_ids)}, weeks={recorded})"
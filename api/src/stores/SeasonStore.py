@@ -0,0 +1,283 @@
+import os
+import numpy as np
+
+class SeasonStore:
+    """
+    The `SeasonStore` class keeps the statistics of every player of a season in dense NumPy arrays, so that
+    aggregate queries run over arrays instead of walking the nested `player_stats` dictionaries.
+
+    The week axis is indexed by the week number itself (index 0 is never played), and stat values are the
+    first element of the `[value, points]` pairs returned by the API.
+
+    Attributes:
+    - `player_ids` (`np.ndarray`): Player ids (int64), aligned to the first axis of every array.
+    - `stat_names` (`list`): Stat names, aligned to the last axis of `stats`.
+    - `stats` (`np.ndarray`): Player x week x stat values (float32).
+    - `total_points` (`np.ndarray`): Player x week points (float32).
+    - `market_value` (`np.ndarray`): Market value of each player when the store was compiled (float64).
+    - `played` (`np.ndarray`): Player x week participation (bool), True where the player has stats for the week.
+    - `minutes` (`np.ndarray`): Player x week minutes played (int16).
+    - `last_update` (`np.ndarray`): `last_update` of the stats file of each player when the store was compiled (int64),
+      None if unknown.
+    - `cum_stats`, `cum_points`, `cum_games` (`np.ndarray`): Prefix sums over the week axis of the stats, the points
+      and the games played (weeks with minutes played), so that totals until a week are a single lookup.
+
+    Methods:
+    - `compile(players: dict, last_updates: dict = None) -> SeasonStore`: Builds a store from the parsed `player_stats` payloads, keyed by player id.
+    - `patch(players: dict, last_updates: dict) -> SeasonStore`: Returns a copy of the store with the rows of some players compiled again.
+    - `save(path: str)`: Saves the store as `.npy` files plus an `index.npz` file in the given directory.
+    - `load(path: str, mmap_mode: str = "r") -> SeasonStore`: Opens a saved store, memory-mapping the arrays.
+    - `exists(path: str) -> bool`: Checks if a saved store exists in the given directory.
+    - `getPlayerIndex(player_id) -> int`: Returns the row of a player, None if the player is not in the store.
+    - `getStatIndex(stat_name: str) -> int`: Returns the column of a stat, None if the stat is not in the store.
+    - `getWeekIndex(week_id: int) -> int`: Returns the column of the prefix sums holding the totals until a week.
+    - `didPlay(rows, week_id: int) -> np.ndarray`: Returns the participation of players (rows) in a week.
+    - `playersWhoPlayed(week_id: int) -> np.ndarray`: Returns the rows of the players who played a week.
+    - `weeksPlayed(row: int) -> np.ndarray`: Returns the week numbers a player (row) played.
+    - `getWeekValues(stat_name: str) -> np.ndarray`: Returns the player x week values of a stat, None if the stat is not in the store.
+    """
+
+    VERSION = 4
+    ARRAYS = ["stats", "total_points", "market_value", "played", "minutes", "last_update", "cum_stats", "cum_points", "cum_games"]
+
+    def __init__(self, player_ids, stat_names, stats, total_points, market_value, played=None, minutes=None, last_update=None, cum_stats=None, cum_points=None, cum_games=None):
+        self.player_ids = np.asarray(player_ids, dtype=np.int64)
+        self.stat_names = [str(name) for name in stat_names]
+        self.stats = stats
+        self.total_points = total_points
+        self.market_value = market_value
+
+        self.player_index = {int(player_id): i for i, player_id in enumerate(self.player_ids)}
+        self.stat_index = {name: i for i, name in enumerate(self.stat_names)}
+
+        if played is None:
+            # Without the participation, any stat or points recorded for the week counts
+            played = self.stats.any(axis=2) | (self.total_points != 0)
+        if minutes is None:
+            minutes = self.__build_minutes()
+        self.played = played
+        self.minutes = minutes
+        self.last_update = last_update
+
+        if cum_stats is None or cum_points is None or cum_games is None:
+            cum_stats, cum_points, cum_games = self.__build_prefix_sums()
+        self.cum_stats = cum_stats
+        self.cum_points = cum_points
+        self.cum_games = cum_games
+
+    @property
+    def n_weeks(self):
+        return self.stats.shape[1]
+
+    @classmethod
+    def compile(cls, players, last_updates=None):
+        """
+        Build a store from the parsed `player_stats` payloads.
+
+        Args:
+            players (dict): Player payloads (as returned by `PlayersService.getStats`) keyed by player id.
+                Players without payload are stored with zeros.
+            last_updates (dict, optional): `last_update` of the stats file of each player, keyed like `players`.
+
+        Returns:
+            SeasonStore: The compiled store.
+        """
+        player_ids = sorted(int(player_id) for player_id in players)
+        payloads = [players.get(player_id) or players.get(str(player_id)) or {} for player_id in player_ids]
+
+        stat_names = set()
+        max_week = 0
+        for payload in payloads:
+            for stat in payload.get('playerStats') or []:
+                max_week = max(max_week, stat.get('weekNumber') or 0)
+                stat_names.update((stat.get('stats') or {}).keys())
+        stat_names = sorted(stat_names)
+        stat_index = {name: i for i, name in enumerate(stat_names)}
+
+        stats = np.zeros((len(player_ids), max_week + 1, len(stat_names)), dtype=np.float32)
+        total_points = np.zeros((len(player_ids), max_week + 1), dtype=np.float32)
+        market_value = np.zeros(len(player_ids), dtype=np.float64)
+        played = np.zeros((len(player_ids), max_week + 1), dtype=bool)
+        for row, payload in enumerate(payloads):
+            market_value[row] = payload.get('marketValue') or 0
+            for stat in payload.get('playerStats') or []:
+                week = stat.get('weekNumber')
+                if not week:
+                    continue
+                played[row, week] = True
+                total_points[row, week] = stat.get('totalPoints') or 0
+                for name, value in (stat.get('stats') or {}).items():
+                    if value:
+                        stats[row, week, stat_index[name]] = value[0]
+
+        if last_updates is not None:
+            last_updates = {int(player_id): last_update for player_id, last_update in last_updates.items()}
+            last_updates = np.array([last_updates.get(player_id) or 0 for player_id in player_ids], dtype=np.int64)
+
+        return cls(player_ids, stat_names, stats, total_points, market_value, played, last_update=last_updates)
+
+    def patch(self, players, last_updates):
+        """
+        Return a copy of the store (in memory) with the rows of some players compiled again from their payloads.
+        The store itself is not modified, so it can still be read while the copy is built.
+
+        Args:
+            players (dict): Player payloads keyed by player id, as for `compile`.
+            last_updates (dict): `last_update` of the stats file of each player, keyed like `players`.
+
+        Returns:
+            SeasonStore: The patched store, None if the payloads don't fit in the store (unknown players, stats or
+                weeks), which must then be compiled again.
+        """
+        rows = [self.getPlayerIndex(player_id) for player_id in players]
+        if not players or any(row is None for row in rows):
+            return None
+        update = self.compile(players, last_updates)
+        if update.n_weeks > self.n_weeks or any(name not in self.stat_index for name in update.stat_names):
+            return None
+
+        rows = np.asarray(rows, dtype=np.int64)
+        update_rows = np.asarray([update.getPlayerIndex(player_id) for player_id in players], dtype=np.int64)
+        weeks = np.arange(update.n_weeks)
+        columns = np.asarray([self.stat_index[name] for name in update.stat_names], dtype=np.int64)
+
+        stats = np.array(self.stats)
+        stats[rows] = 0
+        stats[np.ix_(rows, weeks, columns)] = update.stats[update_rows]
+        arrays = {"total_points": np.array(self.total_points), "played": np.array(self.played), "minutes": np.array(self.minutes)}
+        for name, array in arrays.items():
+            array[rows] = 0
+            array[np.ix_(rows, weeks)] = getattr(update, name)[update_rows]
+        market_value = np.array(self.market_value)
+        market_value[rows] = update.market_value[update_rows]
+        last_update = np.array(self.last_update if self.last_update is not None else np.zeros(len(self.player_ids), dtype=np.int64))
+        last_update[rows] = update.last_update[update_rows]
+
+        # The prefix sums are built again from the patched arrays
+        return SeasonStore(
+            self.player_ids, self.stat_names, stats, arrays["total_points"], market_value,
+            arrays["played"], arrays["minutes"], last_update,
+        )
+
+    def save(self, path):
+        """
+        Save the store in a directory, one `.npy` file per array plus an `index.npz` file.
+
+        Args:
+            path (str): The directory where the store is saved.
+        """
+        os.makedirs(path, exist_ok=True)
+        # Every file is written next to its target and moved over it: the old files stay valid for the processes
+        # that have them memory-mapped (writing over a mapped file in place makes them crash with SIGBUS)
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            if array is None:
+                # Unknown file versions, the store is checked against the files as soon as it is loaded
+                array = np.zeros(len(self.player_ids), dtype=np.int64)
+            temp_path = os.path.join(path, f"{name}.{os.getpid()}.tmp.npy")
+            np.save(temp_path, np.ascontiguousarray(array))
+            os.replace(temp_path, os.path.join(path, name + ".npy"))
+        # The index goes last, so a store is only seen as complete once all its arrays are written
+        temp_path = os.path.join(path, f"index.{os.getpid()}.tmp.npz")
+        np.savez(
+            temp_path,
+            version=np.int64(self.VERSION),
+            player_ids=self.player_ids,
+            stat_names=np.array(self.stat_names, dtype=str),
+        )
+        os.replace(temp_path, os.path.join(path, "index.npz"))
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """
+        Open a saved store. The arrays are memory-mapped, so opening is immediate and the pages are shared
+        between the processes reading the same store.
+
+        Args:
+            path (str): The directory where the store was saved.
+            mmap_mode (str, optional): Memory-map mode passed to `np.load` (default is "r"), None to load in memory.
+
+        Returns:
+            SeasonStore: The loaded store.
+        """
+        with np.load(os.path.join(path, "index.npz")) as index:
+            if int(index["version"]) != cls.VERSION:
+                raise Exception(f"Unsupported season store version {int(index['version'])}")
+            player_ids = index["player_ids"]
+            stat_names = index["stat_names"].tolist()
+        arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap_mode) for name in cls.ARRAYS}
+        if any(array.shape[0] != len(player_ids) for array in arrays.values()):
+            # Opened while the store was being saved again
+            raise Exception("The season store index does not match its arrays")
+        return cls(player_ids, stat_names, **arrays)
+
+    @classmethod
+    def exists(cls, path):
+        return os.path.exists(os.path.join(path, "index.npz"))
+
+    def getPlayerIndex(self, player_id):
+        try:
+            return self.player_index.get(int(player_id))
+        except (TypeError, ValueError):
+            return None
+
+    def getStatIndex(self, stat_name):
+        return self.stat_index.get(stat_name)
+
+    def getWeekIndex(self, week_id=None):
+        """Return the column of the prefix sums holding the totals until the given week (included), None for the whole season."""
+        if week_id is None:
+            return self.n_weeks - 1
+        return min(max(0, int(week_id)), self.n_weeks - 1)
+
+    def getWeekValues(self, stat_name):
+        """Return the player x week values of a stat ('points' for the points, 'mins_played' for the minutes), None if the stat is not in the store."""
+        if stat_name == 'points':
+            return self.total_points
+        elif stat_name == 'mins_played':
+            return self.minutes
+        column = self.getStatIndex(stat_name)
+        if column is None:
+            return None
+        return self.stats[:, :, column]
+
+    def didPlay(self, rows, week_id):
+        """Return the participation of the players at the given rows (an int or an array of rows) in a week, False for unknown weeks."""
+        week_id = int(week_id)
+        if not 0 < week_id < self.n_weeks:
+            return np.zeros(np.shape(rows), dtype=bool)
+        return self.played[rows, week_id]
+
+    def playersWhoPlayed(self, week_id):
+        """Return the rows of the players who played the given week."""
+        week_id = int(week_id)
+        if not 0 < week_id < self.n_weeks:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(self.played[:, week_id])
+
+    def weeksPlayed(self, row):
+        """Return the week numbers played by the player at the given row."""
+        return np.flatnonzero(self.played[row])
+
+    #######################
+    ### PRIVATE METHODS ###
+    #######################
+
+    def __build_minutes(self):
+        column = self.getStatIndex('mins_played')
+        if column is None:
+            return np.zeros(self.total_points.shape, dtype=np.int16)
+        return self.stats[:, :, column].astype(np.int16)
+
+    def __build_prefix_sums(self):
+        cum_stats = np.cumsum(self.stats, axis=1, dtype=np.float32)
+        cum_points = np.cumsum(self.total_points, axis=1, dtype=np.float32)
+        column = self.getStatIndex('mins_played')
+        if column is None:
+            cum_games = np.zeros(self.total_points.shape, dtype=np.int32)
+        else:
+            cum_games = np.cumsum(self.stats[:, :, column] > 0, axis=1, dtype=np.int32)
+        return cum_stats, cum_points, cum_games
+
+    def __repr__(self):
+        return f"SeasonStore(players={len(self.player_ids)}, weeks={self.n_weeks - 1}, stats={len(self.stat_names)})"
@@ -2,26 +2,28 @@ import random
 import numpy as np
 
 from .player import Player
-from pipeline import Pipeline
+from pipeline import Pipeline, METRIC_NAMES
+
+MARKET_VALUE_INDEX = METRIC_NAMES.index('market_value')
 
 def create_player(player_type: str, pipeline: Pipeline):
     player_id = random.randint(1, 100000)
     player_data, next_week_points = pipeline.get_player()
 
     if player_type == "team":
-        release_clause = player_data.get('market_value', 0) + random.randint(100000, 10000000)
+        release_clause = float(player_data[MARKET_VALUE_INDEX]) + random.randint(100000, 10000000)
         player = Player(
             player_id=player_id, 
-            metrics=list(player_data.values()), 
+            metrics=list(player_data), 
             player_type=player_type,
             release_clause=release_clause,
             points=next_week_points
         )
     elif player_type == "market":
-        release_clause = player_data.get('market_value', 0)
+        release_clause = float(player_data[MARKET_VALUE_INDEX])
         player = Player(
             player_id=player_id,
-            metrics=list(player_data.values()),
+            metrics=list(player_data),
             player_type=player_type,
             release_clause=release_clause,
             points=next_week_points
@@ -30,7 +32,7 @@ def create_player(player_type: str, pipeline: Pipeline):
         release_clause = 0
         player = Player(
             player_id=-1,
-            metrics=list(np.zeros(len(player_data.values()))),
+            metrics=list(np.zeros(len(player_data))),
             player_type="empty",
             release_clause=0,
             points=0
@@ -1,5 +1,7 @@
-from pipeline.main import Pipeline
+from pipeline.main import Pipeline, METRICS, METRIC_NAMES
 
 __all__ = [
-    "Pipeline"
+    "Pipeline",
+    "METRICS",
+    "METRIC_NAMES"
 ]
\ No newline at end of file
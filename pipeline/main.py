@@ -1,5 +1,9 @@
+import time
+import queue
 import random
 import logging
+import threading
+import numpy as np
 from enum import Enum
 from functools import lru_cache
 from typing import List, Dict, Any, Tuple
@@ -17,6 +21,32 @@ class Position(Enum):
     DELANTERO = '4'
     ENTRENADOR = '5'
 
+# Player metrics in the order of the metrics vector: (metric name, PlayersService stat name)
+METRICS = [
+    ('total_minutes_played', 'mins_played'),
+    ('total_goals_scored', 'goals'),
+    ('total_assists', 'goal_assist'),
+    ('total_scoring_attempts', 'total_scoring_att'),
+    ('total_effective_clearances', 'effective_clearance'),
+    ('total_ball_recoveries', 'ball_recovery'),
+    ('total_goals_conceded', 'goals_conceded'),
+    ('yellow_cards', 'yellow_card'),
+    ('red_cards', 'red_card'),
+    ('total_possessions_lost', 'poss_lost_all'),
+    ('penalty_area_entries', 'pen_area_entries'),
+    ('total_points_earned', 'points'),
+    ('total_matches_played', 'games_played'),
+    ('penalties_won', 'penalty_won'),
+    ('penalties_conceded', 'penalty_conceded'),
+    ('own_goals', 'own_goals'),
+    ('market_value', 'market_value'),
+]
+METRIC_NAMES = [name for name, _ in METRICS]
+METRIC_STATS = [stat for _, stat in METRICS]
+
+# Maximum number of (player, week) draws before giving up on a sample
+MAX_ATTEMPTS = 1000
+
 class Pipeline:
     """
     Fantasy Football Data Pipeline for Reinforcement Learning.
@@ -25,10 +55,17 @@ class Pipeline:
     - Player data pre-fetching and caching.
     - Intelligent selection to avoid duplicate data.
     - In-memory buffer for quick access.
+    - Table of every valid (player, week) sample compiled at init, so drawing a player is an array lookup.
+
+    `prefetch_workers` producer threads keep up to `buffer_size` samples (of any position) ready in the prefetch queue, so
+    the samples are generated while the agent trains. Producers block while the queue is full, and `get_player` generates
+    the sample itself when the queue is empty. `close` (or leaving the `with` block) stops the producers.
     """
 
-    def __init__(self, buffer_size: int = 50, log_level: str = 'INFO'):
+    def __init__(self, buffer_size: int = 50, log_level: str = 'INFO', precompute: bool = True, prefetch_workers: int = 1):
         self.buffer_size = buffer_size
+        self.precompute = precompute
+        self.prefetch_workers = prefetch_workers
 
         # Logging setup
         logging.basicConfig(level=getattr(logging, log_level.upper()), format='%(asctime)s - %(levelname)s - %(message)s')
@@ -36,41 +73,77 @@ class Pipeline:
 
         # Core components
         self.api = API()
-        self.selected_players = set()
+        # Players already selected, as a mask over the rows of the players roster
+        self.selected_players = None
         self.selected_weeks = set()
 
+        # (player, week) sample table and the shuffled draw order of each position, see `_compile_samples`
+        self.samples = None
+        self.sample_orders = {}
+        # Guards the selection state, shared by the callers and the prefetch threads
+        self.selection_lock = threading.RLock()
+
         # Pre-fetching setup
-        # self.prefetch_queue = queue.Queue(maxsize=self.buffer_size)
-        # self.prefetch_stop_event = threading.Event()
-        # self.prefetch_thread = threading.Thread(target=self._prefetch_data, daemon=True)
+        self.prefetch_queue = queue.Queue(maxsize=max(1, self.buffer_size))
+        self.prefetch_stop_event = threading.Event()
+        self.prefetch_threads = []
+        self.prefetch_hits = 0
+        self.prefetch_misses = 0
 
     def init(self):
         try:
             self.api.init()
-            # self.prefetch_thread.start()
+            self.selected_players = np.zeros(len(self.api.players.getRoster()), dtype=bool)
+            if self.precompute:
+                self._compile_samples()
+            self._start_prefetch()
             self.logger.info("Pipeline initialized.")
         except Exception as e:
             self.logger.error(f"API initialization failed: {e}")
             raise
 
-    def get_player(self, position: Position = Position.NONE) -> Tuple[Dict[str, float], int]:
+    def get_player(self, position: Position = Position.NONE) -> Tuple[np.ndarray, int]:
         """
-        Get player performance data and expected next week's points.
+        Get player performance metrics (ordered as `METRIC_NAMES`) and expected next week's points.
+        Samples of any position are taken from the prefetch queue when one is ready.
+        """
+        if position == Position.NONE and self.prefetch_threads:
+            try:
+                sample = self.prefetch_queue.get_nowait()
+                self.prefetch_hits += 1
+                return sample
+            except queue.Empty:
+                self.prefetch_misses += 1
+        return self._generate_player(position)
+
+    def _generate_player(self, position: Position = Position.NONE) -> Tuple[np.ndarray, int]:
+        """
+        Generate a sample. The samples of the table are drawn without replacement, and generated from the API without it.
         """
-        player_id = self._select_unique_player(position)
-        week_id = self._select_unique_week()
-        played = self.api.players.didPlayerPlay(player_id, week_id)
-        if not played:
-            return self.get_player(position)
-        metrics, next_week_points = self._get_player_data(player_id, week_id)
-        if metrics == None or next_week_points == None:
-            return self.get_player(position)
-        self.logger.debug(f"Player: {player_id}, Week: {week_id}, Next Week Points: {next_week_points}")
-        return metrics, next_week_points
+        with self.selection_lock:
+            index = self._draw_sample(position)
+        if index is not None:
+            metrics, next_week_points = self.samples["features"][index], int(self.samples["next_points"][index])
+            self.logger.debug(f"Player: {self.samples['player_ids'][index]}, Week: {self.samples['week_ids'][index]}, Next Week Points: {next_week_points}")
+            return metrics, next_week_points
 
-    def get_team(self, formation: str) -> List[Dict[str, Any]]:
+        for _ in range(MAX_ATTEMPTS):
+            with self.selection_lock:
+                player_id = self._select_unique_player(position)
+                # Only weeks the player played are drawn
+                week_id = self._select_unique_week(player_id)
+            if week_id is None:
+                continue
+            metrics, next_week_points = self._get_player_data(player_id, week_id)
+            if metrics is None or next_week_points is None:
+                continue
+            self.logger.debug(f"Player: {player_id}, Week: {week_id}, Next Week Points: {next_week_points}")
+            return metrics, next_week_points
+        raise Exception(f"No player data found for position {position.name} after {MAX_ATTEMPTS} attempts")
+
+    def get_team(self, formation: str) -> List[int]:
         """
-        Build a team based on a formation (e.g., '1-4-3-3').
+        Build a team of unique player IDs based on a formation (e.g., '1-4-3-3').
         """
         try:
             positions = list(map(int, formation.split('-')))
@@ -84,23 +157,125 @@ class Pipeline:
                 (Position.CENTROCAMPISTA, positions[2]),
                 (Position.DELANTERO, positions[3]),
             ]
-            for position, count in position_mapping:
-                for _ in range(count):
-                    team.append(self._select_unique_player(position))
+            with self.selection_lock:
+                for position, count in position_mapping:
+                    team.extend(self._select_unique_players(position, count).tolist())
             return team
         except Exception as e:
             self.logger.error(f"Error creating team with formation {formation}: {e}")
             raise
 
-    def _select_unique_week(self) -> int:
+    def _start_prefetch(self):
+        """
+        Start the prefetch threads, if they are not running.
+        """
+        if self.prefetch_threads or self.prefetch_workers <= 0:
+            return
+        self.prefetch_stop_event.clear()
+        for i in range(self.prefetch_workers):
+            thread = threading.Thread(target=self._prefetch_data, name=f"Pipeline-prefetch-{i}", daemon=True)
+            thread.start()
+            self.prefetch_threads.append(thread)
+
+    def _prefetch_data(self):
         """
-        Select a unique week ID.
+        Fill the prefetch queue until the pipeline is closed, waiting while it is full.
         """
-        weeks = self.api.teams.getWeekIds()
-        available_weeks = [w for w in weeks[1:-1] if w not in self.selected_weeks]
+        while not self.prefetch_stop_event.is_set():
+            try:
+                sample = self._generate_player(Position.NONE)
+            except Exception as e:
+                self.logger.error(f"Error pre-fetching player data: {e}")
+                # Don't spin on a persistent error
+                self.prefetch_stop_event.wait(1)
+                continue
+            while not self.prefetch_stop_event.is_set():
+                try:
+                    self.prefetch_queue.put(sample, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def _compile_samples(self):
+        """
+        Compile every valid (player, week) sample: the weeks a player played (except the first and last weeks), with the
+        metrics of the player until the previous week and the points of the week.
+        """
+        start = time.perf_counter()
+        players = self.api.players
+        store = players.getStore()
+
+        weeks = np.asarray(self.api.teams.getWeekIds()[1:-1], dtype=np.int64)
+        weeks = weeks[(weeks > 1) & (weeks < store.n_weeks)]
+        rows, columns = np.nonzero(store.played[:, weeks])
+        week_ids = weeks[columns]
+
+        features = np.zeros((len(rows), len(METRIC_STATS)), dtype=np.float32)
+        valid = np.zeros(len(rows), dtype=bool)
+        for week_id in np.unique(week_ids).tolist():
+            matrix = players.aggregateMatrix(METRIC_STATS, week_id - 1)
+            if matrix is None:
+                continue
+            mask = week_ids == week_id
+            features[mask] = matrix[rows[mask]]
+            valid[mask] = True
+
+        positions = np.zeros(len(store.player_ids), dtype=np.int8)
+        for row, player_id in enumerate(store.player_ids.tolist()):
+            record = players.getRecord(player_id)
+            if record is not None:
+                positions[row] = record['position_id']
+
+        rows, week_ids, features = rows[valid], week_ids[valid], features[valid]
+        self.samples = {
+            "player_ids": store.player_ids[rows],
+            "week_ids": week_ids,
+            "positions": positions[rows],
+            "features": features,
+            "next_points": np.asarray(store.total_points[rows, week_ids], dtype=np.float32),
+        }
+        for array in self.samples.values():
+            # Returned to the callers, so it must not be modified by them
+            array.flags.writeable = False
+        self.sample_orders = {}
+        self.logger.info(f"Compiled {len(rows)} samples in {time.perf_counter() - start:.2f}s.")
+
+    def _draw_sample(self, position: Position = Position.NONE) -> int:
+        """
+        Draw the index of a sample of a position from the table, without replacement until every sample of the
+        position was drawn. Returns None if there is no table or no sample for the position.
+        """
+        if self.samples is None:
+            return None
+        order, cursor = self.sample_orders.get(position.value, (None, 0))
+        if order is None or cursor >= len(order):
+            if position == Position.NONE:
+                candidates = np.arange(len(self.samples["positions"]))
+            else:
+                candidates = np.flatnonzero(self.samples["positions"] == int(position.value))
+            if not len(candidates):
+                return None
+            # Seeded from `random`, so the draws follow `random.seed`
+            order = np.random.default_rng(random.getrandbits(64)).permutation(candidates)
+            cursor = 0
+        self.sample_orders[position.value] = (order, cursor + 1)
+        return int(order[cursor])
+
+    def _select_unique_week(self, player_id: int = None) -> int:
+        """
+        Select a unique week ID, among the weeks played by a player if one is given.
+        Returns None if the player did not play any of the weeks.
+        """
+        weeks = self.api.teams.getWeekIds()[1:-1]
+        if player_id is not None:
+            played = self.api.players.getWeeksPlayed(player_id)
+            weeks = np.intersect1d(np.asarray(weeks, dtype=np.int64), played).tolist()
+            if not weeks:
+                return None
+        available_weeks = [w for w in weeks if w not in self.selected_weeks]
         if not available_weeks:
-            self.selected_weeks.clear()
-            available_weeks = weeks[1:-1]
+            self.selected_weeks.difference_update(weeks)
+            available_weeks = weeks
         week_id = random.choice(available_weeks)
         self.selected_weeks.add(week_id)
         return week_id
@@ -109,64 +284,63 @@ class Pipeline:
         """
         Select a unique player based on position.
         """
-        players = self.api.players.getPlayersIds()
-        if position != Position.NONE:
-            players = [p for p in players if p['positionId'] == position.value]
-        available_players = [p for p in players if int(p) not in self.selected_players]
-        if not available_players:
-            self.selected_players.clear()
-            available_players = players
-        player = random.choice(available_players)
-        self.selected_players.add(int(player))
-        return int(player)
+        return int(self._select_unique_players(position, 1)[0])
 
-    def _get_player_data(self, player_id: int, week_id: int) -> Tuple[Dict[str, float], int]:
+    def _select_unique_players(self, position: Position = Position.NONE, count: int = 1) -> np.ndarray:
+        """
+        Select `count` distinct players of a position that were not selected yet. The selection of the
+        position starts over when not enough of its players are left.
+        """
+        rows = self.api.players.getPlayersByPosition(position.value, rows=True)
+        if len(rows) < count:
+            raise ValueError(f"Not enough players for position {position.name}: {len(rows)} < {count}")
+        available = rows[~self.selected_players[rows]]
+        if len(available) < count:
+            self.selected_players[rows] = False
+            available = rows
+        chosen = available[random.sample(range(len(available)), count)]
+        self.selected_players[chosen] = True
+        return self.api.players.getRoster()['id'][chosen]
+
+    def _get_player_data(self, player_id: int, week_id: int) -> Tuple[np.ndarray, int]:
         """
         Get player performance data and expected next week's points.
         """
         metrics = self._get_player_performance_metrics(player_id, week_id - 1)
-        if metrics == None:
+        if metrics is None:
             return None, None
         next_week_stats = self.api.players.getStatsForWeek(player_id, week_id)
-        if next_week_stats == None:
+        if next_week_stats is None:
             return None, None
         return metrics, next_week_stats.get('totalPoints', 0)
 
     @lru_cache(maxsize=1000)
-    def _get_player_performance_metrics(self, player_id: int, week_id: int) -> Dict[str, float]:
+    def _get_player_performance_metrics(self, player_id: int, week_id: int) -> np.ndarray:
         """
-        Get player performance metrics.
+        Get player performance metrics, ordered as `METRIC_NAMES`.
         """
-        try:
-            return {
-                'total_minutes_played': self.api.players.getTotalMinutesPlayed(player_id, week_id),
-                'total_goals_scored': self.api.players.getTotalGoals(player_id, week_id),
-                'total_assists': self.api.players.getTotalAssists(player_id, week_id),
-                'total_scoring_attempts': self.api.players.getTotalTotalScoringAttempts(player_id, week_id),
-                'total_effective_clearances': self.api.players.getTotalEffectiveClearances(player_id, week_id),
-                'total_ball_recoveries': self.api.players.getTotalBallRecovery(player_id, week_id),
-                'total_goals_conceded': self.api.players.getTotalGoalsConceded(player_id, week_id),
-                'yellow_cards': self.api.players.getTotalYellowCards(player_id, week_id),
-                'red_cards': self.api.players.getTotalRedCards(player_id, week_id),
-                'total_possessions_lost': self.api.players.getTotalPossessionLostAll(player_id, week_id),
-                'penalty_area_entries': self.api.players.getTotalPenaltyAreaEntries(player_id, week_id),
-                'total_points_earned': self.api.players.getTotalPoints(player_id, week_id),
-                'total_matches_played': self.api.players.getTotalGamesPlayed(player_id, week_id),
-                'penalties_won': self.api.players.getTotalPenaltiesWon(player_id, week_id),
-                'penalties_conceded': self.api.players.getTotalPenaltiesConceded(player_id, week_id),
-                'own_goals': self.api.players.getTotalOwnGoals(player_id, week_id),
-                'market_value': self.api.players.getMarketValue(player_id),
-            }
-        except Exception as e:
-            self.logger.warning(f"Error retrieving metrics for player {player_id}, week {week_id}: {e}")
+        metrics = self.api.players.getMetricsVector(player_id, week_id, METRIC_STATS)
+        if metrics is None:
+            self.logger.warning(f"Error retrieving metrics for player {player_id}, week {week_id}")
             return None
+        # Cached, so it must not be modified by the callers
+        metrics.flags.writeable = False
+        return metrics
 
     def close(self):
         """
         Stop pre-fetching and release resources.
         """
-        # self.prefetch_stop_event.set()
-        # self.prefetch_thread.join()
+        self.prefetch_stop_event.set()
+        for thread in self.prefetch_threads:
+            thread.join()
+        self.prefetch_threads = []
+        # Drop the samples left, they are generated again if the pipeline is initialized again
+        while True:
+            try:
+                self.prefetch_queue.get_nowait()
+            except queue.Empty:
+                break
         self.logger.info("Pipeline resources closed.")
 
     def __enter__(self):
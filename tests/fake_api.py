@@ -0,0 +1,89 @@
+import json, time, hashlib, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class FakeApi:
+    """
+    Local stand-in for the fantasy API, served by a `ThreadingHTTPServer` in a background thread.
+
+    Every path returns a JSON object built from the path, with an `ETag`, and answers 304 to a matching
+    `If-None-Match`. Failures can be injected per path, and the requests are counted.
+
+    Attributes:
+    - `url` (`str`): Base URL of the server.
+    - `delay` (`float`): Seconds each request takes.
+    - `failures` (`dict`): Number of 503 answers to send for a path before answering normally.
+    - `requests`, `not_modified`, `unavailable` (`int`): Number of requests, 304 and 503 answers.
+    - `max_in_flight` (`int`): Maximum number of requests handled at the same time.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.failures = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+        self.unavailable = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.__handler())
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def payload(self, path):
+        return {"id": path.rstrip('/').split('/')[-1], "points": len(path), "extra": "dropped"}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    #######################
+    ### PRIVATE METHODS ###
+    #######################
+
+    def __handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with api.lock:
+                    api.requests += 1
+                    api.in_flight += 1
+                    api.max_in_flight = max(api.max_in_flight, api.in_flight)
+                    failing = api.failures.get(self.path, 0) > 0
+                    if failing:
+                        api.failures[self.path] -= 1
+                        api.unavailable += 1
+                try:
+                    if api.delay:
+                        time.sleep(api.delay)
+                    if failing:
+                        self.__send(503)
+                        return
+                    body = json.dumps(api.payload(self.path)).encode('utf-8')
+                    etag = '"' + hashlib.sha256(body).hexdigest() + '"'
+                    if self.headers.get('If-None-Match') == etag:
+                        with api.lock:
+                            api.not_modified += 1
+                        self.__send(304, headers={'ETag': etag})
+                    else:
+                        self.__send(200, body, {'ETag': etag, 'Content-Type': 'application/json'})
+                finally:
+                    with api.lock:
+                        api.in_flight -= 1
+
+            def __send(self, status, body=b'', headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
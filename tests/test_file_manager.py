@@ -0,0 +1,132 @@
+import os, shutil, tempfile, unittest
+
+from api.src.managers.FileManager import FileManager
+from api.src.managers.RequestManager import RequestManager
+from tests.fake_api import FakeApi
+
+class FileManagerRefreshTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.api = FakeApi()
+        self.requestManager = RequestManager(max_workers=4, backoff_factor=0)
+        self.fileManager = FileManager(self.requestManager, os.path.join(self.directory, 'index.json'))
+        FileManager.cache.clear()
+
+    def tearDown(self):
+        self.requestManager.executor.shutdown(wait=True)
+        self.fileManager.flush()
+        self.api.close()
+        FileManager.cache.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def getFiles(self, count):
+        files = []
+        for i in range(count):
+            meta = {
+                "id": i,
+                "name": f"player_{i}",
+                "url": f"{self.api.url}/api/v3/player/{i}",
+                "last_update": 0,
+                "update_interval": 3600,
+                "fields": ["id", "points"],
+            }
+            files.append((os.path.join(self.directory, f"player_{i}.json"), meta))
+        return files
+
+    def test_refresh_many_updates_stale_files(self):
+        files = self.getFiles(8)
+        report = self.fileManager.refresh_many(files)
+
+        self.assertEqual(set(report.values()), {"updated"})
+        self.assertEqual(self.api.requests, 8)
+        for file_path, meta in files:
+            data = self.fileManager.read(file_path, meta)
+            self.assertEqual(data, {"id": str(meta["id"]), "points": len(f"/api/v3/player/{meta['id']}")})
+
+        # Fresh files are not requested again
+        report = self.fileManager.refresh_many([file_path for file_path, _ in files])
+        self.assertEqual(set(report.values()), {"fresh"})
+        self.assertEqual(self.api.requests, 8)
+
+    def test_refresh_many_bounds_concurrency(self):
+        self.api.delay = 0.05
+        report = self.fileManager.refresh_many(self.getFiles(8), max_concurrency=2)
+
+        self.assertEqual(set(report.values()), {"updated"})
+        self.assertLessEqual(self.api.max_in_flight, 2)
+
+    def test_refresh_many_runs_requests_concurrently(self):
+        self.api.delay = 0.05
+        self.fileManager.refresh_many(self.getFiles(8))
+
+        self.assertGreater(self.api.max_in_flight, 1)
+        self.assertLessEqual(self.api.max_in_flight, self.requestManager.max_workers)
+
+    def test_not_modified_only_updates_meta(self):
+        files = self.getFiles(2)
+        self.fileManager.refresh_many(files)
+        file_path = files[0][0]
+        with open(file_path, 'rb') as file:
+            raw = file.read()
+        mtime = os.stat(file_path).st_mtime_ns
+        meta = self.fileManager.getMeta(file_path)
+        meta["last_update"] = 0
+        self.fileManager.backend.writeMeta(file_path, meta)
+
+        report = self.fileManager.refresh_many([file_path])
+
+        self.assertEqual(report, {file_path: "not_modified"})
+        self.assertEqual(self.api.not_modified, 1)
+        # The file is not written again, only its meta is
+        with open(file_path, 'rb') as file:
+            self.assertEqual(file.read(), raw)
+        self.assertEqual(os.stat(file_path).st_mtime_ns, mtime)
+        self.assertGreater(self.fileManager.getMeta(file_path)["last_update"], 0)
+        self.assertEqual(self.fileManager.read(file_path, files[0][1])["id"], "0")
+
+    def test_conditional_get_sends_etag(self):
+        files = self.getFiles(1)
+        self.fileManager.refresh_many(files)
+        self.assertTrue(self.fileManager.getMeta(files[0][0]).get("etag"))
+
+        report = self.fileManager.refresh_many(files, force=True)
+
+        self.assertEqual(set(report.values()), {"not_modified"})
+        self.assertEqual(self.api.requests, 2)
+        self.assertEqual(self.api.not_modified, 1)
+
+    def test_retries_unavailable_server(self):
+        files = self.getFiles(1)
+        self.api.failures["/api/v3/player/0"] = 2
+
+        report = self.fileManager.refresh_many(files)
+
+        self.assertEqual(set(report.values()), {"updated"})
+        self.assertEqual(self.api.requests, 3)
+        counters = self.fileManager.metrics.snapshot()["counters"]
+        self.assertEqual(counters["http.retries"]["total"], 2)
+        self.assertNotIn("http.errors", counters)
+
+    def test_gives_up_after_retries(self):
+        files = self.getFiles(1)
+        self.api.failures["/api/v3/player/0"] = 10
+
+        report = self.fileManager.refresh_many(files)
+
+        self.assertEqual(set(report.values()), {"failed"})
+        self.assertEqual(self.api.requests, self.requestManager.retries + 1)
+        counters = self.fileManager.metrics.snapshot()["counters"]
+        self.assertEqual(counters["http.retries"]["total"], self.requestManager.retries)
+        self.assertEqual(counters["http.errors"]["total"], 1)
+        self.assertEqual(counters["refresh.failed"]["total"], 1)
+
+    def test_refresh_many_offline(self):
+        self.fileManager.setConfig({'offline': True})
+        report = self.fileManager.refresh_many(self.getFiles(2))
+
+        self.assertEqual(set(report.values()), {"failed"})
+        self.assertEqual(self.api.requests, 0)
+
+if __name__ == '__main__':
+    unittest.main()
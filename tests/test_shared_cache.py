@@ -0,0 +1,47 @@
+import os, stat, shutil, tempfile, unittest
+
+from api.common.utils.SharedCache import SharedCache
+
+@unittest.skipUnless(hasattr(os, 'getuid'), "no owner or permission bits to check")
+class SharedCachePermissionsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_creates_private_directory(self):
+        cache = SharedCache(os.path.join(self.directory, 'cache'))
+        info = os.stat(cache.path)
+        self.assertEqual(info.st_uid, os.getuid())
+        self.assertEqual(stat.S_IMODE(info.st_mode) & 0o077, 0)
+        cache.push('key', {"id": "0"}, 'v1')
+        self.assertEqual(cache.get('key', 'v1'), {"id": "0"})
+
+    def test_default_directory_is_per_user(self):
+        self.assertTrue(SharedCache().path.endswith(f'-{os.getuid()}'))
+
+    def test_refuses_open_directory(self):
+        path = os.path.join(self.directory, 'open')
+        os.mkdir(path)
+        os.chmod(path, 0o777)
+        with self.assertRaises(Exception):
+            SharedCache(path)
+
+    def test_refuses_symlink(self):
+        path = os.path.join(self.directory, 'link')
+        os.symlink(self.directory, path)
+        with self.assertRaises(Exception):
+            SharedCache(path)
+
+    @unittest.skipUnless(hasattr(os, 'getuid') and os.getuid() == 0, "changing the owner requires root")
+    def test_refuses_directory_of_another_user(self):
+        path = os.path.join(self.directory, 'other')
+        os.mkdir(path, 0o700)
+        os.chown(path, 65534, 65534)
+        with self.assertRaises(Exception):
+            SharedCache(path)
+
+if __name__ == '__main__':
+    unittest.main()
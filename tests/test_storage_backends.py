@@ -0,0 +1,67 @@
+import os, shutil, tempfile, unittest
+
+from api.src.backends.StorageBackend import msgpack
+from api.src.backends.FileBackend import FileBackend
+from api.src.backends.SQLiteBackend import SQLiteBackend
+
+class StorageBackendFormatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.backends = []
+
+    def tearDown(self):
+        for backend in self.backends:
+            backend.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def getBackend(self, name, storage_format):
+        if name == "sqlite":
+            backend = SQLiteBackend(os.path.join(self.directory, f'{storage_format}.sqlite3'))
+        else:
+            backend = FileBackend(os.path.join(self.directory, f'{storage_format}-index.json'))
+        backend.setConfig({'storage_format': storage_format})
+        self.backends.append(backend)
+        return backend
+
+    def getContents(self):
+        meta = {"id": 0, "name": "player_0", "url": "", "last_update": 1, "update_interval": 3600, "fields": []}
+        datas = [
+            {},
+            {"id": "0", "points": 12},
+            # Maps and arrays of more than 15 items have other msgpack prefixes
+            {f"stat_{i}": i for i in range(40)},
+            [{"week": i, "points": i * 2} for i in range(40)],
+            list(range(70000)),
+        ]
+        return [(os.path.join(self.directory, f'player_{i}.json'), {"meta": dict(meta, id=i), "data": data}) for i, data in enumerate(datas)]
+
+    def assertRoundTrip(self, backend):
+        contents = self.getContents()
+        for path, content in contents:
+            backend.write(path, content)
+        for path, content in contents:
+            data, meta, _ = backend.read(path)
+            self.assertEqual(data, content["data"])
+            self.assertEqual(meta["id"], content["meta"]["id"])
+        read = backend.readMany([path for path, _ in contents])
+        self.assertEqual({path: data for path, (data, _, _) in read.items()}, {path: content["data"] for path, content in contents})
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_sqlite_msgpack_round_trip(self):
+        self.assertRoundTrip(self.getBackend("sqlite", "msgpack"))
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_file_msgpack_round_trip(self):
+        self.assertRoundTrip(self.getBackend("file", "msgpack"))
+
+    def test_round_trip_formats(self):
+        for name in ("file", "sqlite"):
+            for storage_format in ("json", "json-indent", "gzip", "pickle"):
+                with self.subTest(backend=name, storage_format=storage_format):
+                    shutil.rmtree(self.directory, ignore_errors=True)
+                    os.makedirs(self.directory)
+                    self.assertRoundTrip(self.getBackend(name, storage_format))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,3 @@
-import torch
-import matplotlib.pyplot as plt
-
 from algorithms.DQN.train import train
 from pipeline import Pipeline
 from environment import Environment
@@ -15,4 +12,5 @@ if __name__ == "__main__":
     # Train the agent
     agent, rewards = train(env, n_episodes=5000)
     # Save the trained model
-#     torch.save(agent.policy_net.state_dict(), "trained_model.pth")
\ No newline at end of file
+    # import torch
+    # torch.save(agent.policy_net.state_dict(), "trained_model.pth")
\ No newline at end of file